@@ -0,0 +1,290 @@
+"""Re-run analysis stages over existing attempts.
+
+    uv run python backfill.py                                       # every stale row, all stages
+    uv run python backfill.py --stages heuristics --question 3
+    uv run python backfill.py --stages coaching --since 2026-01-01 --force
+    uv run python backfill.py --dry-run                             # count what would be redone
+
+Each Analytics and Feedback row records the version of the rules or prompt that produced
+it (``heuristics_version``, ``llm_version``, ``prompt_version``). A row is stale when
+that version is not one the current code produces, and only stale rows are recomputed
+unless --force is given. Attempts with an analysis job in flight are left alone.
+
+Heuristics run in batches on a process pool. LLM stages use the separate analytics and
+coaching prompts, fanned out as concurrent async requests through the Gemini gateway,
+whose concurrency and rate limits still apply. Progress is checkpointed after every
+batch: an interrupted run resumes where it stopped when started again with the same
+arguments (--restart ignores the checkpoint).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, AnalysisJob, Analytics, Attempt, Feedback, Question, Transcription, init_db
+from services.coach import PROMPT_VERSION as COACHING_PROMPT_VERSION, aget_coaching_feedback
+from services.combined_analysis import PROMPT_VERSION as COMBINED_PROMPT_VERSION
+from services.gemini import shutdown_gateway
+from services.jobs import ACTIVE_STATUSES
+from services.llm_analytics import PROMPT_VERSION as LLM_PROMPT_VERSION, aanalyze_speech_with_llm
+from services.rollups import SCORE_METRICS, ensure_rollups, record_analytics
+from services.speech_analytics import HEURISTICS_VERSION, analyze_speech_batch
+from services.versions import bump_question
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("heuristics", "llm_analytics", "coaching")
+BATCH_SIZE = 500
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "backfill.checkpoint.json")
+
+# Versions that count as up to date; rows from the combined prompt are current too
+CURRENT_VERSIONS = {
+    "heuristics": (HEURISTICS_VERSION,),
+    "llm_analytics": (LLM_PROMPT_VERSION, COMBINED_PROMPT_VERSION),
+    "coaching": (COACHING_PROMPT_VERSION, COMBINED_PROMPT_VERSION),
+}
+VERSION_COLUMNS = {
+    "heuristics": (Analytics, Analytics.heuristics_version),
+    "llm_analytics": (Analytics, Analytics.llm_version),
+    "coaching": (Feedback, Feedback.prompt_version),
+}
+
+
+def select_attempts(db: Session, stage: str, args, after_id: int, limit: int) -> list[int]:
+    """Ids of the next `limit` attempts after `after_id` that `stage` should redo."""
+    query = (
+        db.query(Attempt.id)
+        .join(Transcription, Transcription.attempt_id == Attempt.id)
+        .filter(
+            Attempt.id > after_id,
+            ~exists().where(
+                AnalysisJob.attempt_id == Attempt.id, AnalysisJob.status.in_(ACTIVE_STATUSES)
+            ),
+        )
+    )
+    if args.question:
+        query = query.filter(Attempt.question_id.in_(args.question))
+    if args.attempt:
+        query = query.filter(Attempt.id.in_(args.attempt))
+    if args.since:
+        query = query.filter(Attempt.created_at >= args.since)
+    if args.until:
+        query = query.filter(Attempt.created_at < args.until)
+    if not args.force:
+        model, column = VERSION_COLUMNS[stage]
+        query = query.outerjoin(model, model.attempt_id == Attempt.id).filter(
+            or_(column.is_(None), column.notin_(CURRENT_VERSIONS[stage]))
+        )
+    return [attempt_id for (attempt_id,) in query.order_by(Attempt.id).limit(limit).all()]
+
+
+def _load_inputs(db: Session, ids: list[int]) -> list[tuple]:
+    return (
+        db.query(
+            Attempt.id, Attempt.question_id, Attempt.duration_seconds, Question.question_text,
+            Transcription.transcript_text, Transcription.word_timestamps_blob, Transcription.word_timestamps,
+        )
+        .join(Question, Question.id == Attempt.question_id)
+        .join(Transcription, Transcription.attempt_id == Attempt.id)
+        .filter(Attempt.id.in_(ids))
+        .order_by(Attempt.id)
+        .all()
+    )
+
+
+def _get_or_add(db: Session, model, rows: dict, attempt_id: int, **defaults):
+    row = rows.get(attempt_id)
+    if row is None:
+        row = model(attempt_id=attempt_id, **defaults)
+        db.add(row)
+        rows[attempt_id] = row
+    return row
+
+
+def run_heuristics(db: Session, inputs: list[tuple], pool: ProcessPoolExecutor, workers: int) -> tuple[int, int]:
+    items = [(row.transcript_text, row.word_timestamps_blob or row.word_timestamps, row.duration_seconds) for row in inputs]
+    size = max(1, -(-len(items) // workers))
+    results = [
+        scores
+        for chunk in pool.map(analyze_speech_batch, [items[i:i + size] for i in range(0, len(items), size)])
+        for scores in chunk
+    ]
+
+    ids = [row.id for row in inputs]
+    rows = {a.attempt_id: a for a in db.query(Analytics).filter(Analytics.attempt_id.in_(ids))}
+    for row, data in zip(inputs, results):
+        analytics = rows.get(row.id)
+        old = {f"{m}_score": getattr(analytics, f"{m}_score") for m in SCORE_METRICS} if analytics else None
+        analytics = _get_or_add(db, Analytics, rows, row.id)
+        for column, value in data.items():
+            setattr(analytics, column, value)
+        analytics.heuristics_version = HEURISTICS_VERSION
+        record_analytics(db, data, old)
+    for question_id in {row.question_id for row in inputs}:
+        bump_question(db, question_id)
+    db.commit()
+    return len(results), 0
+
+
+async def _fan_out(stage: str, inputs: list[tuple], concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(row):
+        async with semaphore:
+            try:
+                if stage == "llm_analytics":
+                    return await aanalyze_speech_with_llm(row.transcript_text)
+                return await aget_coaching_feedback(row.question_text, row.transcript_text)
+            except Exception as e:
+                logger.warning("%s failed for attempt %d: %s", stage, row.id, e)
+                return None
+
+    return await asyncio.gather(*(one(row) for row in inputs))
+
+
+def run_llm_stage(db: Session, stage: str, inputs: list[tuple], concurrency: int) -> tuple[int, int]:
+    results = asyncio.run(_fan_out(stage, inputs, concurrency))
+
+    model = Analytics if stage == "llm_analytics" else Feedback
+    ids = [row.id for row in inputs]
+    rows = {r.attempt_id: r for r in db.query(model).filter(model.attempt_id.in_(ids))}
+    updated = 0
+    for row, result in zip(inputs, results):
+        if result is None:
+            continue
+        if stage == "llm_analytics":
+            analytics = _get_or_add(db, Analytics, rows, row.id)
+            for column, value in result.items():
+                setattr(analytics, column, value)
+            analytics.llm_version = LLM_PROMPT_VERSION
+        else:
+            feedback_text, star_scores = result
+            feedback = _get_or_add(db, Feedback, rows, row.id, coach_feedback=feedback_text)
+            feedback.coach_feedback = feedback_text
+            feedback.star_scores = star_scores
+            feedback.prompt_version = COACHING_PROMPT_VERSION
+        bump_question(db, row.question_id)
+        updated += 1
+    db.commit()
+    return updated, len(inputs) - updated
+
+
+def _run_key(args) -> str:
+    """Identifies a run's arguments, so a checkpoint only resumes the same backfill."""
+    payload = json.dumps([
+        args.stages, sorted(args.question or []), sorted(args.attempt or []),
+        str(args.since), str(args.until), args.force, args.limit,
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _load_checkpoint(path: str, key: str) -> dict[str, int]:
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if checkpoint.get("key") != key:
+        logger.info("Ignoring checkpoint from a backfill with different arguments")
+        return {}
+    return checkpoint["after"]
+
+
+def _save_checkpoint(path: str, key: str, after: dict[str, int]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "after": after}, f)
+    os.replace(tmp_path, path)
+
+
+def backfill(args) -> dict:
+    key = _run_key(args)
+    after = {} if args.restart else _load_checkpoint(args.checkpoint, key)
+    report = {}
+
+    pool = ProcessPoolExecutor(max_workers=args.workers) if "heuristics" in args.stages and not args.dry_run else None
+    try:
+        for stage in args.stages:
+            started = time.perf_counter()
+            cursor = after.get(stage, 0)
+            entry = {"selected": 0, "updated": 0, "failed": 0, "resumed_after": cursor or None}
+            while args.limit is None or entry["selected"] < args.limit:
+                batch_size = BATCH_SIZE if args.limit is None else min(BATCH_SIZE, args.limit - entry["selected"])
+                db = SessionLocal()
+                try:
+                    ids = select_attempts(db, stage, args, cursor, batch_size)
+                    if not ids:
+                        break
+                    entry["selected"] += len(ids)
+                    if not args.dry_run:
+                        inputs = _load_inputs(db, ids)
+                        if stage == "heuristics":
+                            updated, failed = run_heuristics(db, inputs, pool, args.workers)
+                        else:
+                            updated, failed = run_llm_stage(db, stage, inputs, args.concurrency)
+                        entry["updated"] += updated
+                        entry["failed"] += failed
+                finally:
+                    db.close()
+
+                cursor = ids[-1]
+                if not args.dry_run:
+                    after[stage] = cursor
+                    _save_checkpoint(args.checkpoint, key, after)
+                    logger.info("%s: %d selected, %d updated so far", stage, entry["selected"], entry["updated"])
+            entry["seconds"] = round(time.perf_counter() - started, 2)
+            report[stage] = entry
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if not args.dry_run and os.path.exists(args.checkpoint):
+        os.unlink(args.checkpoint)  # finished; the next run starts from the beginning
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run analysis stages over existing attempts")
+    parser.add_argument(
+        "--stages", default=",".join(STAGES),
+        help=f"comma-separated subset of {', '.join(STAGES)} (default: all)",
+    )
+    parser.add_argument("--question", type=int, action="append", help="only this question (repeatable)")
+    parser.add_argument("--attempt", type=int, action="append", help="only this attempt (repeatable)")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only attempts created at or after (UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="only attempts created before (UTC)")
+    parser.add_argument("--limit", type=int, help="at most this many attempts per stage")
+    parser.add_argument("--force", action="store_true", help="redo rows that are already current")
+    parser.add_argument("--dry-run", action="store_true", help="count the attempts each stage would redo")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for heuristics")
+    parser.add_argument("--concurrency", type=int, default=16, help="LLM requests in flight per batch")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    args.stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    args.stages = [stage for stage in STAGES if stage in args.stages]  # dependency order
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    ensure_rollups()
+    try:
+        print(json.dumps(backfill(args), indent=2))
+    finally:
+        shutdown_gateway()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compare ASR backends on sample recordings: wall time and word-timestamp agreement.
+
+    uv run python -m benchmarks.asr_backends                    # every file in data/recordings
+    uv run python -m benchmarks.asr_backends a.webm b.webm --backends whisper faster-whisper
+
+The first backend is the reference. For every other backend the words are aligned to the
+reference with difflib; agreement is the share of reference words matched, and the start/end
+deltas are measured over matched words only.
+"""
+import argparse
+import difflib
+import glob
+import json
+import os
+import re
+import statistics
+import time
+
+from services.asr import BACKENDS
+from services.audio import RECORDINGS_DIR
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def compare_words(reference: list[dict], candidate: list[dict]) -> dict:
+    ref_tokens = [_normalize(w["word"]) for w in reference]
+    cand_tokens = [_normalize(w["word"]) for w in candidate]
+    matcher = difflib.SequenceMatcher(a=ref_tokens, b=cand_tokens, autojunk=False)
+
+    start_deltas = []
+    end_deltas = []
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            ref, cand = reference[block.a + k], candidate[block.b + k]
+            start_deltas.append(abs(ref["start"] - cand["start"]))
+            end_deltas.append(abs(ref["end"] - cand["end"]))
+
+    matched = len(start_deltas)
+    return {
+        "word_agreement": round(matched / len(reference), 4) if reference else None,
+        "mean_start_delta": round(statistics.fmean(start_deltas), 3) if matched else None,
+        "mean_end_delta": round(statistics.fmean(end_deltas), 3) if matched else None,
+        "within_200ms": (
+            round(sum(1 for s, e in zip(start_deltas, end_deltas) if s <= 0.2 and e <= 0.2) / matched, 4)
+            if matched else None
+        ),
+    }
+
+
+def run(paths: list[str], backend_names: list[str]) -> dict:
+    backends = {}
+    load_seconds = {}
+    for name in backend_names:
+        backend = BACKENDS[name]()
+        t0 = time.perf_counter()
+        backend.load()
+        load_seconds[name] = round(time.perf_counter() - t0, 3)
+        backends[name] = backend
+
+    recordings = []
+    for path in paths:
+        row = {"recording": os.path.basename(path), "backends": {}}
+        reference_words = None
+        for name, backend in backends.items():
+            t0 = time.perf_counter()
+            _text, words = backend.transcribe(path)
+            entry = {"wall_seconds": round(time.perf_counter() - t0, 3), "words": len(words)}
+            if reference_words is None:
+                reference_words = words
+            else:
+                entry.update(compare_words(reference_words, words))
+            row["backends"][name] = entry
+        recordings.append(row)
+
+    summary = {}
+    for name in backend_names:
+        entries = [r["backends"][name] for r in recordings]
+        summary[name] = {
+            "load_seconds": load_seconds[name],
+            "total_wall_seconds": round(sum(e["wall_seconds"] for e in entries), 3),
+        }
+        agreements = [e["word_agreement"] for e in entries if e.get("word_agreement") is not None]
+        if agreements:
+            summary[name]["mean_word_agreement"] = round(statistics.fmean(agreements), 4)
+
+    return {"reference": backend_names[0], "summary": summary, "recordings": recordings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recordings", nargs="*", help="recording files (default: data/recordings/*.webm)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--limit", type=int, default=10, help="max recordings when using the default set")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    paths = args.recordings or sorted(glob.glob(os.path.join(RECORDINGS_DIR, "*.webm")))[: args.limit]
+    if not paths:
+        parser.error("no recordings found")
+
+    results = run(paths, args.backends)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
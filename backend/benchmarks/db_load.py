@@ -0,0 +1,187 @@
+"""Concurrent read/write load test for the storage layer.
+
+    uv run python -m benchmarks.db_load                            # scratch SQLite file
+    uv run python -m benchmarks.db_load --compare                  # default vs tuned SQLite
+    uv run python -m benchmarks.db_load --url postgresql+psycopg://localhost/starcoach_load
+
+Writer threads follow the upload and analysis write path (attempt, rollups, analytics);
+reader threads run the dashboard, progress and status queries. Reports throughput,
+latency percentiles and errors ("database is locked") per operation as JSON. Never point
+--url at a database you care about: it gets test rows.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def run(writers: int, readers: int, seconds: float) -> dict:
+    # Imported here so STARCOACH_DATABASE_URL can be set first
+    from database import SessionLocal, Attempt, Analytics, DATABASE_URL, SQLITE_TUNED, init_db
+    from routers.analysis import _status_document
+    from routers.dashboard import get_dashboard
+    from seed_questions import seed
+    from services.progress import compute_progress
+    from services.rollups import ensure_rollups, record_analytics, record_attempt
+
+    init_db()
+    seed()
+    ensure_rollups()
+
+    results: dict[str, dict] = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+    attempt_ids: list[int] = []
+
+    def record(op: str, elapsed: float, error: Exception | None):
+        with lock:
+            entry = results.setdefault(op, {"latencies": [], "errors": {}})
+            if error is None:
+                entry["latencies"].append(elapsed)
+            else:
+                name = str(error).splitlines()[0][:80]
+                entry["errors"][name] = entry["errors"].get(name, 0) + 1
+
+    def timed(op: str, fn):
+        db = SessionLocal()
+        started = time.perf_counter()
+        error = None
+        try:
+            fn(db)
+        except Exception as e:
+            db.rollback()
+            error = e
+        finally:
+            db.close()
+        record(op, time.perf_counter() - started, error)
+
+    def write_attempt(db):
+        question_id = random.randint(1, 8)
+        attempt = Attempt(question_id=question_id, attempt_number=1, video_path="load.webm", duration_seconds=60)
+        db.add(attempt)
+        db.flush()
+        attempt_id = attempt.id
+        record_attempt(db, question_id, 60)
+        db.commit()
+        with lock:
+            attempt_ids.append(attempt_id)
+
+    def write_analytics(db):
+        with lock:
+            if not attempt_ids:
+                return
+            attempt_id = attempt_ids.pop()
+        scores = {name: random.randint(1, 5) for name in ("clarity_score", "confidence_score", "structure_score")}
+        db.add(Analytics(attempt_id=attempt_id, pause_count=2, filler_word_count=3, **scores))
+        record_analytics(db, scores)
+        db.commit()
+
+    def read_status(db):
+        with lock:
+            attempt_id = attempt_ids[-1] if attempt_ids else 1
+        _status_document(db, attempt_id)
+
+    def writer():
+        while not stop.is_set():
+            timed("write_attempt", write_attempt)
+            timed("write_analytics", write_analytics)
+
+    def reader():
+        ops = [
+            ("read_dashboard", get_dashboard),
+            ("read_progress", lambda db: compute_progress(random.randint(1, 8), db)),
+            ("read_status", read_status),
+        ]
+        while not stop.is_set():
+            op, fn = random.choice(ops)
+            timed(op, fn)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "database": DATABASE_URL.split("@")[-1],
+        "sqlite_tuned": SQLITE_TUNED if DATABASE_URL.startswith("sqlite") else None,
+        "writers": writers,
+        "readers": readers,
+        "seconds": round(elapsed, 2),
+        "operations": {},
+    }
+    for op, entry in sorted(results.items()):
+        latencies = entry["latencies"]
+        report["operations"][op] = {
+            "ok": len(latencies),
+            "per_second": round(len(latencies) / elapsed, 1),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "errors": entry["errors"],
+        }
+    return report
+
+
+def _run_child(args, env: dict) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.db_load",
+        "--writers", str(args.writers), "--readers", str(args.readers), "--seconds", str(args.seconds),
+    ]
+    output = subprocess.run(
+        command, env={**os.environ, **env}, check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output[output.index("{"):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: a scratch SQLite file)")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--compare", action="store_true", help="run default and tuned SQLite side by side")
+    args = parser.parse_args()
+
+    if args.compare:
+        results = []
+        for tuned in ("0", "1"):
+            with tempfile.TemporaryDirectory() as tmp:
+                url = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+                results.append(_run_child(args, {"STARCOACH_DATABASE_URL": url, "STARCOACH_SQLITE_TUNED": tuned}))
+        print(json.dumps(results, indent=2))
+        return
+
+    if args.url:
+        os.environ["STARCOACH_DATABASE_URL"] = args.url
+        print(json.dumps(run(args.writers, args.readers, args.seconds), indent=2))
+    elif os.environ.get("STARCOACH_DATABASE_URL"):
+        print(json.dumps(run(args.writers, args.readers, args.seconds), indent=2))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["STARCOACH_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+            print(json.dumps(run(args.writers, args.readers, args.seconds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
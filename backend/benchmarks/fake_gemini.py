@@ -0,0 +1,121 @@
+"""A local stand-in for the Gemini API.
+
+Answers ``POST /v1beta/models/<model>:generateContent`` with a JSON document that
+satisfies the request's ``responseJsonSchema``, after an optional delay, and can inject
+rate-limit errors. Point the backend at it with ``STARCOACH_GEMINI_BASE_URL``:
+
+    uv run python -m benchmarks.fake_gemini --port 8765 --latency 0.5 --error-rate 0.1
+    STARCOACH_GEMINI_BASE_URL=http://127.0.0.1:8765 GOOGLE_API_KEY=stub uv run python worker.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_instance(schema: dict, defs: dict | None = None):
+    """Build the smallest value that validates against a (pydantic-generated) JSON schema."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fake_instance(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "anyOf" in schema:
+        return fake_instance(schema["anyOf"][0], defs)
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: fake_instance(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_instance(schema.get("items", {}), defs)]
+    if kind == "integer":
+        return schema.get("minimum", 3)
+    if kind == "number":
+        return schema.get("minimum", 1.0)
+    if kind == "boolean":
+        return True
+    return "Stub response from the fake Gemini server."
+
+
+class FakeGemini:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                    fail = random.random() < fake.error_rate
+                    if fail:
+                        fake.errors += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fail:
+                    self._send(429, {"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}})
+                    return
+
+                schema = (body.get("generationConfig") or {}).get("responseJsonSchema") or {}
+                text = json.dumps(fake_instance(schema)) if schema else "{}"
+                self._send(200, {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": [{"text": text}]},
+                        "finishReason": "STOP",
+                    }],
+                    "usageMetadata": {"promptTokenCount": len(json.dumps(body)) // 4, "candidatesTokenCount": len(text) // 4},
+                })
+
+        return Handler
+
+    def start(self) -> "FakeGemini":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Gemini API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = FakeGemini(args.host, args.port, args.latency, args.error_rate)
+    print(f"Fake Gemini listening on {server.base_url}")
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
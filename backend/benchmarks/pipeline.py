@@ -0,0 +1,420 @@
+"""End-to-end benchmark suite: bulk data, read endpoints, uploads and the analysis pipeline.
+
+    uv run python -m benchmarks.pipeline                                   # 10k attempts, stubs only
+    uv run python -m benchmarks.pipeline --attempts 1000000 --output bench.json
+    uv run python -m benchmarks.pipeline --asr tiny --pipeline-attempts 5
+    uv run python -m benchmarks.pipeline --baseline bench.json             # exit 1 on regressions
+
+Runs against a scratch database and recordings directory in a temp dir, with Gemini
+answered by the local fake server (benchmarks.fake_gemini). Requests go through the ASGI
+app in-process, so they include routing, middleware and serialization but no network.
+
+Phases:
+  populate   bulk-insert synthetic analyzed attempts and rebuild the rollups
+  endpoints  read endpoints at that scale: uncached, from the response cache, and as 304s
+  upload     one-shot and resumable uploads of a synthetic recording
+  pipeline   run_analysis over new attempts, with per-stage latency from analysis_stages
+
+With --asr none (the default) new attempts arrive with a transcript, as streamed uploads
+do, and transcription is skipped. --asr tiny transcribes synthetic recordings with the
+tiny model of the configured backend (needs ffmpeg and the ASR dependencies).
+
+The JSON report has latency percentiles in ms, throughput per second and the peak RSS
+after each phase. With --baseline, every p95 and throughput is compared with an older
+report; any that got worse by more than --max-regression are listed and the exit code is 1.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks import synthetic
+from benchmarks.fake_gemini import FakeGemini
+
+PHASES = ("populate", "endpoints", "upload", "pipeline")
+LOWER_IS_BETTER = ("p95_ms",)
+HIGHER_IS_BETTER = ("per_second", "mb_per_second")
+MIN_P95_DELTA_MS = 0.5  # smaller differences are noise
+
+
+def summarize(samples: list[float], elapsed: float | None = None) -> dict:
+    """Latency percentiles (ms) for `samples` in seconds, plus throughput if `elapsed` is given."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    summary = {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+    if elapsed:
+        summary["per_second"] = round(len(samples) / elapsed, 1)
+    return summary
+
+
+def peak_rss_mb() -> dict:
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 2**20, 1),
+    }
+
+
+def _use_data_dir(data_dir: str):
+    """Point every module that stores files at the scratch directory."""
+    from routers import recordings
+    from services import audio, streaming, uploads
+
+    recordings_dir = os.path.join(data_dir, "recordings")
+    uploads_dir = os.path.join(data_dir, "uploads")
+    os.makedirs(recordings_dir, exist_ok=True)
+    audio.RECORDINGS_DIR = recordings.RECORDINGS_DIR = recordings_dir
+    streaming.UPLOADS_DIR = uploads.UPLOADS_DIR = uploads_dir
+    return recordings_dir
+
+
+def _time_requests(client, urls, headers=None, expect=200) -> dict:
+    samples = []
+    started = time.perf_counter()
+    for url in urls:
+        t0 = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - t0)
+        if response.status_code != expect:
+            raise RuntimeError(f"GET {url} returned {response.status_code}, expected {expect}")
+    return summarize(samples, time.perf_counter() - started)
+
+
+def bench_endpoints(client, requests: int) -> dict:
+    from database import SessionLocal, Attempt
+
+    db = SessionLocal()
+    try:
+        question_id = 1
+        attempt_id = (
+            db.query(Attempt.id).filter(Attempt.question_id == question_id)
+            .order_by(Attempt.id.desc()).limit(1).scalar()
+        )
+    finally:
+        db.close()
+
+    routes = {
+        "questions": "/api/questions",
+        "dashboard": "/api/dashboard",
+        "attempts_page": f"/api/attempts/{question_id}",
+        "attempts_page_full": f"/api/attempts/{question_id}?fields=transcription,analytics,feedback",
+        "recordings_page": "/api/recordings",
+    }
+    if attempt_id is not None:
+        routes.update({
+            "attempt_detail": f"/api/attempts/{question_id}/{attempt_id}",
+            "progress": f"/api/attempts/{question_id}/progress",
+            "analysis_status": f"/api/analyze/{attempt_id}/status",
+        })
+
+    results = {}
+    for name, url in routes.items():
+        separator = "&" if "?" in url else "?"
+        # A unique query string misses the response cache but is ignored by the route
+        entry = {"uncached": _time_requests(client, [f"{url}{separator}_bench={i}" for i in range(requests)])}
+        first = client.get(url)
+        entry["cached"] = _time_requests(client, [url] * requests)
+        etag = first.headers.get("etag")
+        if etag:
+            entry["revalidated"] = _time_requests(client, [url] * requests, {"If-None-Match": etag}, expect=304)
+        results[name] = entry
+    return results
+
+
+def bench_uploads(client, recording: bytes, count: int) -> dict:
+    megabytes = len(recording) / 2**20
+
+    samples = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        response = client.post(
+            "/api/recordings",
+            data={"question_id": 1, "duration_seconds": 60},
+            files={"video": ("recording.webm", recording, "video/webm")},
+        )
+        response.raise_for_status()
+        samples.append(time.perf_counter() - t0)
+    one_shot = summarize(samples)
+
+    samples = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        upload = client.post("/api/recordings/uploads", data={"question_id": 1, "size": len(recording)}).json()
+        offset = 0
+        while offset < len(recording):
+            chunk = recording[offset:offset + upload["chunk_size"]]
+            response = client.put(
+                f"/api/recordings/uploads/{upload['upload_id']}",
+                params={"offset": offset},
+                content=chunk,
+                headers={"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()},
+            )
+            response.raise_for_status()
+            offset = response.json()["offset"]
+        client.post(f"/api/recordings/uploads/{upload['upload_id']}/finalize").raise_for_status()
+        samples.append(time.perf_counter() - t0)
+    resumable = summarize(samples)
+
+    for summary in (one_shot, resumable):
+        if summary["n"]:
+            summary["mb_per_second"] = round(megabytes / (summary["mean_ms"] / 1000), 1)
+    return {"recording_mb": round(megabytes, 2), "one_shot": one_shot, "resumable": resumable}
+
+
+def bench_pipeline(count: int, concurrency: int, asr: str, recording_path: str | None) -> dict:
+    from database import SessionLocal, AnalysisStage, Transcription
+    from routers.analysis import run_analysis
+    from routers.recordings import RECORDINGS_DIR, _add_attempt
+    from services.stages import finish_stage
+    from services.word_timestamps import encode_words
+
+    rng = random.Random(1)
+    attempt_ids = []
+    db = SessionLocal()
+    try:
+        for i in range(count):
+            filename = f"bench_{i:05d}.webm"
+            attempt = _add_attempt(db, i % 8 + 1, filename, 60, 120)
+            if asr == "none":
+                words = synthetic.synthetic_words(rng, 150)
+                db.add(Transcription(
+                    attempt_id=attempt.id,
+                    transcript_text=" ".join(w["word"] for w in words),
+                    word_timestamps_blob=encode_words(words),
+                ))
+                finish_stage(db, attempt.id, "transcription")
+            else:
+                shutil.copyfile(recording_path, os.path.join(RECORDINGS_DIR, filename))
+            db.commit()
+            attempt_ids.append(attempt.id)
+    finally:
+        db.close()
+
+    def timed(attempt_id: int) -> float:
+        t0 = time.perf_counter()
+        run_analysis(attempt_id)
+        return time.perf_counter() - t0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        end_to_end = list(executor.map(timed, attempt_ids))
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(AnalysisStage.stage, AnalysisStage.status, AnalysisStage.started_at, AnalysisStage.finished_at)
+            .filter(AnalysisStage.attempt_id.in_(attempt_ids))
+            .all()
+        )
+    finally:
+        db.close()
+
+    stages: dict[str, list[float]] = {}
+    failed: dict[str, int] = {}
+    for stage, status, started_at, finished_at in rows:
+        if status == "failed":
+            failed[stage] = failed.get(stage, 0) + 1
+        elif started_at is not None and finished_at is not None:
+            stages.setdefault(stage, []).append(finished_at - started_at)
+
+    return {
+        "attempts": count,
+        "concurrency": concurrency,
+        "asr": asr,
+        "end_to_end": summarize(end_to_end, elapsed),
+        "stages": {stage: summarize(samples) for stage, samples in stages.items()},
+        "failed_stages": failed,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Every p95 or throughput in `report` that is worse than in `baseline` by more than `tolerance`."""
+    regressions = []
+
+    def walk(current, previous, path):
+        if isinstance(current, dict) and isinstance(previous, dict):
+            for key, value in current.items():
+                if key in previous:
+                    walk(value, previous[key], path + (key,))
+            return
+        if not isinstance(current, (int, float)) or not isinstance(previous, (int, float)) or not previous:
+            return
+        key = path[-1]
+        if key in LOWER_IS_BETTER:
+            worse = current > previous * (1 + tolerance) and current - previous > MIN_P95_DELTA_MS
+        elif key in HIGHER_IS_BETTER:
+            worse = current < previous * (1 - tolerance)
+        else:
+            return
+        if worse:
+            regressions.append({
+                "metric": ".".join(path), "baseline": previous, "current": current,
+                "change": round(current / previous - 1, 3),
+            })
+
+    walk(report["phases"], baseline.get("phases", {}), ())
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, data_dir: str) -> dict:
+    fake = FakeGemini(latency=args.llm_latency).start()
+    # Configuration is read at import time, so set it before importing the app
+    os.environ["STARCOACH_DATABASE_URL"] = f"sqlite:///{os.path.join(data_dir, 'bench.db')}"
+    os.environ["STARCOACH_EMBEDDED_WORKERS"] = "0"
+    # A background model load would overlap the timed phases; the pipeline phase loads it on first use
+    os.environ["STARCOACH_ASR_WARMUP"] = "0"
+    os.environ["STARCOACH_GEMINI_BASE_URL"] = fake.base_url
+    os.environ["STARCOACH_LLM_RATE_PER_MINUTE"] = str(args.llm_rate)
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    if args.asr != "none":
+        os.environ["STARCOACH_ASR_MODEL"] = args.asr
+
+    from fastapi.testclient import TestClient
+
+    from database import init_db
+    from main import app
+    from seed_questions import seed
+    from services.gemini import shutdown_gateway
+    from services.rollups import ensure_rollups
+    from services.transcription import shutdown_engine
+
+    recordings_dir = _use_data_dir(data_dir)
+    # Everything the app prints (seed() at startup, in the lifespan too) goes to stderr,
+    # so stdout carries only the report
+    with contextlib.redirect_stdout(sys.stderr):
+        init_db()
+        seed()
+        ensure_rollups()
+
+        phases = {}
+        try:
+            if "populate" in args.phases:
+                phases["populate"] = synthetic.populate(args.attempts)
+                phases["populate"]["peak_rss_mb"] = peak_rss_mb()
+
+            with TestClient(app) as client:
+                if "endpoints" in args.phases:
+                    phases["endpoints"] = bench_endpoints(client, args.requests)
+                    phases["endpoints"]["peak_rss_mb"] = peak_rss_mb()
+
+                recording = synthetic.recording_bytes(args.recording_seconds, data_dir)
+                if "upload" in args.phases:
+                    phases["upload"] = bench_uploads(client, recording, args.uploads)
+                    phases["upload"]["peak_rss_mb"] = peak_rss_mb()
+
+            if "pipeline" in args.phases:
+                recording_path = None
+                if args.asr != "none":
+                    recording_path = os.path.join(data_dir, "pipeline.webm")
+                    if not synthetic.make_recording(recording_path, args.recording_seconds):
+                        raise SystemExit("--asr needs ffmpeg to build synthetic recordings")
+                requests_before = fake.requests
+                phases["pipeline"] = bench_pipeline(args.pipeline_attempts, args.concurrency, args.asr, recording_path)
+                phases["pipeline"]["llm_requests"] = fake.requests - requests_before
+                phases["pipeline"]["peak_rss_mb"] = peak_rss_mb()
+        finally:
+            shutdown_engine()
+            shutdown_gateway()
+            fake.stop()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "recordings_dir": recordings_dir,
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "phases": phases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=10_000, help="synthetic attempts in the database")
+    parser.add_argument("--phases", default=",".join(PHASES), help=f"comma-separated subset of {', '.join(PHASES)}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and mode")
+    parser.add_argument("--uploads", type=int, default=5, help="uploads per upload mode")
+    parser.add_argument("--recording-seconds", type=float, default=60)
+    parser.add_argument("--pipeline-attempts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="analyses run at once")
+    parser.add_argument("--asr", default="none", help='"none" (stored transcripts) or an ASR model name, e.g. "tiny"')
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake Gemini response time in seconds")
+    parser.add_argument("--llm-rate", type=float, default=6000, help="gateway rate limit (requests per minute)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    args.phases = [p.strip() for p in args.phases.split(",") if p.strip()]
+    unknown = set(args.phases) - set(PHASES)
+    if unknown:
+        parser.error(f"unknown phases: {', '.join(sorted(unknown))}")
+
+    data_dir = tempfile.mkdtemp(prefix="starcoach-bench-")
+    try:
+        report = run(args, data_dir)
+    finally:
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.max_regression)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print(
+                f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']}",
+                file=sys.stderr,
+            )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
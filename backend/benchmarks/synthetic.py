@@ -0,0 +1,145 @@
+"""Synthetic data for benchmarks: recordings and a populated database.
+
+Everything is generated from a seeded RNG, so two runs with the same arguments produce
+the same data. Only point this at a scratch database.
+"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import insert
+
+VOCABULARY = (
+    "I led the migration of our billing service to a new queue and worked with the "
+    "platform team to roll it out region by region while keeping error rates flat the "
+    "result was a forty percent drop in latency and fewer pages for the on call rotation"
+).split()
+FILLERS = ("um", "uh", "you know", "basically", "actually", "kind of")
+
+
+def synthetic_words(rng: random.Random, count: int) -> list[dict]:
+    """A transcript's worth of words with plausible timings, fillers and pauses."""
+    words = []
+    t = 0.0
+    for _ in range(count):
+        word = rng.choice(FILLERS) if rng.random() < 0.05 else rng.choice(VOCABULARY)
+        duration = rng.uniform(0.15, 0.45)
+        words.append({"word": word, "start": round(t, 2), "end": round(t + duration, 2)})
+        t += duration + (rng.uniform(1.6, 3.0) if rng.random() < 0.03 else rng.uniform(0.02, 0.2))
+    return words
+
+
+def make_recording(path: str, seconds: float) -> bool:
+    """Write a `seconds`-long VP8/Opus .webm (test pattern and tone), like the browser sends.
+
+    Returns False when ffmpeg is not installed; callers fall back to random bytes.
+    """
+    if shutil.which("ffmpeg") is None:
+        return False
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=48000:duration={seconds}",
+        "-c:v", "libvpx", "-b:v", "1M", "-c:a", "libopus", "-shortest", path,
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+    return True
+
+
+def recording_bytes(seconds: float, directory: str) -> bytes:
+    """Contents of a synthetic recording: a real .webm if possible, else ~1 Mbit/s of noise."""
+    path = os.path.join(directory, f"synthetic_{seconds:g}s.webm")
+    if not os.path.exists(path) and not make_recording(path, seconds):
+        return np.random.default_rng(0).bytes(int(seconds * 128 * 1024))
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def populate(attempts: int, batch_size: int = 10_000, seed: int = 0) -> dict:
+    """Insert `attempts` analyzed attempts spread over the last year, then rebuild rollups.
+
+    Each attempt gets a transcript with word timestamps, analytics and feedback. Uses
+    bulk Core inserts, so a million attempts take minutes rather than hours.
+    """
+    from database import SessionLocal, Analytics, Attempt, Feedback, Question, Transcription
+    from services.rollups import rebuild_rollups
+    from services.speech_analytics import HEURISTICS_VERSION
+    from services.versions import ATTEMPTS, QUESTIONS, bump, question_key
+    from services.word_timestamps import encode_words
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        question_ids = [q for (q,) in db.query(Question.id).order_by(Question.id)]
+        next_number = {q: 1 for q in question_ids}
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        first_id = 1 + (db.query(Attempt.id).order_by(Attempt.id.desc()).limit(1).scalar() or 0)
+
+        for offset in range(0, attempts, batch_size):
+            count = min(batch_size, attempts - offset)
+            ids = range(first_id + offset, first_id + offset + count)
+            # Oldest first, so ids and created_at grow together as they do in production
+            ages = sorted((rng.uniform(0, 365 * 86400) for _ in ids), reverse=True)
+            attempt_rows, transcription_rows, analytics_rows, feedback_rows = [], [], [], []
+            for attempt_id, age in zip(ids, ages):
+                question_id = rng.choice(question_ids)
+                words = synthetic_words(rng, rng.randint(40, 120))
+                duration = words[-1]["end"]
+                attempt_rows.append({
+                    "id": attempt_id,
+                    "question_id": question_id,
+                    "attempt_number": next_number[question_id],
+                    "video_path": f"{question_id}_{attempt_id:08x}.webm",
+                    "duration_seconds": round(duration, 1),
+                    "timer_setting": 120,
+                    "created_at": now - timedelta(seconds=age),
+                })
+                next_number[question_id] += 1
+                transcription_rows.append({
+                    "attempt_id": attempt_id,
+                    "transcript_text": " ".join(w["word"] for w in words),
+                    "word_timestamps_blob": encode_words(words),
+                })
+                analytics_rows.append({
+                    "attempt_id": attempt_id,
+                    "pause_count": rng.randint(0, 6),
+                    "filler_word_count": rng.randint(0, 8),
+                    "filler_words_detail": json.dumps({"um": rng.randint(0, 4)}),
+                    "answer_duration_seconds": round(duration, 1),
+                    "words_per_minute": round(len(words) / duration * 60, 1),
+                    "clarity_score": rng.randint(1, 5),
+                    "confidence_score": rng.randint(1, 5),
+                    "structure_score": rng.randint(1, 5),
+                    "heuristics_version": HEURISTICS_VERSION,
+                })
+                feedback_rows.append({
+                    "attempt_id": attempt_id,
+                    "coach_feedback": "Synthetic coaching feedback.",
+                    "star_scores": json.dumps({k: rng.randint(1, 5) for k in ("situation", "task", "action", "result")}),
+                })
+            db.execute(insert(Attempt), attempt_rows)
+            db.execute(insert(Transcription), transcription_rows)
+            db.execute(insert(Analytics), analytics_rows)
+            db.execute(insert(Feedback), feedback_rows)
+            db.commit()
+
+        inserted = time.perf_counter() - started
+        rebuild_rollups(db)
+        bump(db, QUESTIONS, ATTEMPTS, *(question_key(q) for q in question_ids))
+        db.commit()
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "attempts": attempts,
+        "insert_seconds": round(inserted, 2),
+        "rollup_rebuild_seconds": round(elapsed - inserted, 2),
+        "attempts_per_second": round(attempts / inserted, 1) if inserted else None,
+    }
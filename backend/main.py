@@ -1,44 +1,89 @@
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from database import init_db
 from seed_questions import seed
-from routers import questions, recordings, analysis, attempts, dashboard
+from routers import questions, recordings, analysis, attempts, dashboard, admin
+from services.gemini import shutdown_gateway
+from services.http_cache import conditional_get
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics, track_requests
+from services.profiling import profile_requests
+from services.readiness import mark_database_ready, readiness, start_asr_warm_up
+from services.retention import start_compactor
+from services.rollups import ensure_rollups
+from services.transcription import shutdown_engine
+from worker import start_workers
 
 RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "recordings")
 os.makedirs(RECORDINGS_DIR, exist_ok=True)
 
+# Analysis workers run inside the API process unless a standalone worker.py is deployed
+EMBEDDED_WORKERS = int(os.environ.get("STARCOACH_EMBEDDED_WORKERS", "1"))
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
     seed()
+    ensure_rollups()
+    mark_database_ready()
+    # Streaming uploads transcribe in this process, and so do embedded workers
+    start_asr_warm_up()
+    stop_workers, _ = start_workers(EMBEDDED_WORKERS)
+    if EMBEDDED_WORKERS:
+        start_compactor(stop_workers)
     yield
+    stop_workers.set()
+    shutdown_engine()
+    shutdown_gateway()
 
 
 app = FastAPI(title="STARCoach API", lifespan=lifespan)
 
+# Registered before CORS so it runs inside it: cached replays and 304s get the CORS
+# headers for the current request's Origin, and the cache never stores them
+app.middleware("http")(conditional_get)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Profile-Id"],
 )
+# Added last so it wraps the cache and sees 304s and cached responses too
+app.middleware("http")(track_requests)
+# Outermost, so a profiled request bypasses the response cache
+app.middleware("http")(profile_requests)
 
 app.include_router(questions.router, prefix="/api")
 app.include_router(recordings.router, prefix="/api")
 app.include_router(analysis.router, prefix="/api")
 app.include_router(attempts.router, prefix="/api")
 app.include_router(dashboard.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 app.mount("/recordings", StaticFiles(directory=RECORDINGS_DIR), name="recordings")
 
 
 @app.get("/api/health")
+@app.get("/api/health/live")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/api/health/ready")
+def health_ready():
+    """503 until the database is set up and the speech model is loaded; use for health checks."""
+    ready, state = readiness()
+    return JSONResponse(state, status_code=200 if ready else 503)
+
+
+@app.get("/api/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -1,4 +1,17 @@
-from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict
+
+from services.word_timestamps import to_json
+
+
+def format_timestamp(value):
+    """Render DateTime columns the way the API has always returned them: 'YYYY-MM-DD HH:MM:SS'."""
+    return value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime) else value
+
+
+Timestamp = Annotated[str | None, BeforeValidator(format_timestamp)]
 
 
 class QuestionOut(BaseModel):
@@ -20,7 +33,9 @@ class AttemptOut(BaseModel):
     video_path: str
     duration_seconds: float | None = None
     timer_setting: int | None = None
-    created_at: str | None = None
+    created_at: Timestamp = None
+    audio_path: str | None = None  # set once archived; equals video_path if the video was dropped
+    archived_at: Timestamp = None
 
 
 class TranscriptionOut(BaseModel):
@@ -31,6 +46,19 @@ class TranscriptionOut(BaseModel):
     transcript_text: str
     word_timestamps: str | None = None
 
+    @classmethod
+    def from_row(cls, transcription, include_word_timestamps: bool = False) -> "TranscriptionOut":
+        """Build from a Transcription row. Word timestamps are decoded to JSON only when asked for."""
+        return cls(
+            id=transcription.id,
+            attempt_id=transcription.attempt_id,
+            transcript_text=transcription.transcript_text,
+            word_timestamps=(
+                to_json(transcription.word_timestamps_blob, transcription.word_timestamps)
+                if include_word_timestamps else None
+            ),
+        )
+
 
 class FeedbackOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -64,6 +92,7 @@ class AnalyticsOut(BaseModel):
 
 class AttemptDetailOut(BaseModel):
     attempt: AttemptOut
+    analyzed: bool = False  # coaching feedback exists
     transcription: TranscriptionOut | None = None
     feedback: FeedbackOut | None = None
     analytics: AnalyticsOut | None = None
@@ -75,7 +104,7 @@ class ProgressPoint(BaseModel):
     confidence_score: int | None = None
     structure_score: int | None = None
     star_scores: str | None = None
-    created_at: str | None = None
+    created_at: Timestamp = None
 
 
 class ProgressOut(BaseModel):
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from services.profiling import PROFILING_ENABLED, delete_profile, get_profile, list_profiles, pstats_text
+
+router = APIRouter()
+
+
+def _require_profiling():
+    # The profiling surface does not exist unless it was switched on
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+@router.get("/admin/profiles", dependencies=[Depends(_require_profiling)])
+def get_profiles():
+    return list_profiles()
+
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(_require_profiling)])
+def download_profile(profile_id: str, format: str = "raw"):
+    """The stored profile file. ``format=text`` renders a cProfile dump as a pstats table."""
+    found = get_profile(profile_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    meta, path = found
+    if format == "text":
+        if meta["format"] != "pstats":
+            raise HTTPException(status_code=400, detail="Only job profiles have a text rendering")
+        return PlainTextResponse(pstats_text(path))
+    if meta["format"] == "collapsed":
+        return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+
+@router.delete("/admin/profiles/{profile_id}", dependencies=[Depends(_require_profiling)])
+def remove_profile(profile_id: str):
+    if not delete_profile(profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"deleted": profile_id}
@@ -1,22 +1,93 @@
+import asyncio
+import json
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func as sa_func
 from sqlalchemy.orm import Session
 
-from database import get_db, Attempt, Transcription, Feedback, Analytics
+from database import get_db, AnalysisStage, Attempt, Transcription, Feedback, Analytics
 from models import TranscriptionOut, FeedbackOut, AnalyticsOut
-from services.transcription import transcribe_audio
-from services.speech_analytics import analyze_speech
-from services.coach import get_coaching_feedback
-from services.llm_analytics import analyze_speech_with_llm
+from services.transcription import transcribe_words, engine_stats
+from services.word_timestamps import encode_words
+from services.speech_analytics import HEURISTICS_VERSION, analyze_speech
+from services.coach import PROMPT_VERSION as COACHING_PROMPT_VERSION, get_coaching_feedback
+from services.llm_analytics import PROMPT_VERSION as LLM_PROMPT_VERSION, analyze_speech_with_llm
+from services.combined_analysis import LLM_MODE, PROMPT_VERSION as COMBINED_PROMPT_VERSION, analyze_and_coach
+from services.jobs import enqueue_analysis, queue_stats
+from services.gemini import gateway_stats
+from services.llm_cache import cache_stats
+from services.http_cache import cache_stats as http_cache_stats
+from services import events
+from services.profiling import PROFILING_ENABLED
+from services.retention import retention_stats
+from services.rollups import record_analytics
+from services.versions import bump_question
+from services.stages import STAGES, stage_statuses, stage_timings, start_stage, finish_stage, abandon_stages
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+KEEPALIVE_SECONDS = 15
+
+
+def _resolved(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _status_document(db: Session, attempt_id: int, include_word_timestamps: bool = False) -> dict:
+    transcription = db.query(Transcription).filter_by(attempt_id=attempt_id).first()
+    analytics = db.query(Analytics).filter_by(attempt_id=attempt_id).first()
+    feedback = db.query(Feedback).filter_by(attempt_id=attempt_id).first()
+
+    if feedback:
+        status = "complete"
+    elif analytics:
+        status = "feedback_pending"
+    elif transcription:
+        status = "analytics_pending"
+    else:
+        status = "transcribing"
+
+    result = {
+        "status": status,
+        "attempt_id": attempt_id,
+        "stages": stage_statuses(db, attempt_id),
+    }
+
+    if transcription:
+        result["transcription"] = TranscriptionOut.from_row(transcription, include_word_timestamps)
+    if analytics:
+        result["analytics"] = AnalyticsOut.model_validate(analytics)
+    if feedback:
+        result["feedback"] = FeedbackOut.model_validate(feedback)
+
+    return result
+
+
+def _publish(db: Session, attempt_id: int, event: str):
+    """Push the attempt's current status to SSE subscribers."""
+    try:
+        events.publish(attempt_id, event, jsonable_encoder(_status_document(db, attempt_id)))
+    except Exception:
+        logger.exception("Failed to build %s event for attempt %d", event, attempt_id)
+
 
 def run_analysis(attempt_id: int):
+    """Run the analysis pipeline for an attempt.
+
+    Transcript, heuristics, LLM analytics and coaching are committed and published as
+    separate stages, so the filler/pace/pause metrics show up while Gemini is still
+    working. Stages that already have a stored result are skipped, so a retried job
+    resumes where the previous run stopped. Raises on failure so the job queue can retry.
+    """
     from database import SessionLocal
 
     db = SessionLocal()
@@ -24,93 +95,168 @@ def run_analysis(attempt_id: int):
         attempt = db.get(Attempt, attempt_id)
         if not attempt:
             return
+        if db.query(Feedback).filter_by(attempt_id=attempt_id).first():
+            return
+        stages = stage_statuses(db, attempt_id)
 
-        # Transcribe (must complete before parallel tasks)
-        transcript_text, word_timestamps = transcribe_audio(attempt.video_path)
-        transcription = Transcription(
-            attempt_id=attempt_id,
-            transcript_text=transcript_text,
-            word_timestamps=word_timestamps,
-        )
-        db.add(transcription)
-        db.commit()
+        # Transcribe (must complete before the other stages)
+        transcription = db.query(Transcription).filter_by(attempt_id=attempt_id).first()
+        if transcription is None:
+            start_stage(db, attempt_id, "transcription")
+            try:
+                transcript_text, words = transcribe_words(attempt.video_path)
+            except Exception as e:
+                finish_stage(db, attempt_id, "transcription", error=str(e))
+                raise
+            transcription = Transcription(
+                attempt_id=attempt_id,
+                transcript_text=transcript_text,
+                word_timestamps_blob=encode_words(words),
+            )
+            db.add(transcription)
+            bump_question(db, attempt.question_id)
+            finish_stage(db, attempt_id, "transcription")
+            _publish(db, attempt_id, "transcription")
+        elif stages["transcription"] != "done":
+            # Streamed uploads arrive with their transcript already stored
+            finish_stage(db, attempt_id, "transcription")
+
+        transcript_text = transcription.transcript_text
+        word_timestamps = transcription.word_timestamps_blob or transcription.word_timestamps
 
         question_text = attempt.question.question_text
         duration = attempt.duration_seconds
+        analytics = db.query(Analytics).filter_by(attempt_id=attempt_id).first()
+        need_llm = stages["llm_analytics"] != "done"
 
-        # Run heuristic analytics, LLM analytics, and coaching in parallel
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            heuristic_future = executor.submit(
-                analyze_speech, transcript_text, word_timestamps, duration
-            )
-            llm_future = executor.submit(analyze_speech_with_llm, transcript_text)
-            coaching_future = executor.submit(
-                get_coaching_feedback, question_text, transcript_text
-            )
-
-            # Collect heuristic results
-            try:
-                analytics_data = heuristic_future.result()
-            except Exception:
-                logger.exception("Heuristic analytics failed for attempt %d", attempt_id)
-                analytics_data = {}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Start the Gemini calls first: they only need the transcript
+            combined_future = llm_future = coaching_future = None
+            llm_version, coaching_version = LLM_PROMPT_VERSION, COACHING_PROMPT_VERSION
+            if LLM_MODE == "combined" and need_llm:
+                combined_future = executor.submit(analyze_and_coach, question_text, transcript_text)
+            else:
+                if need_llm:
+                    llm_future = executor.submit(analyze_speech_with_llm, transcript_text)
+                coaching_future = executor.submit(
+                    get_coaching_feedback, question_text, transcript_text
+                )
+            if need_llm:
+                start_stage(db, attempt_id, "llm_analytics")
+            start_stage(db, attempt_id, "coaching")
 
-            # Collect LLM results
-            try:
-                llm_data = llm_future.result()
-            except Exception:
-                logger.exception("LLM analytics failed for attempt %d", attempt_id)
-                llm_data = None
+            # Heuristic analytics take milliseconds; store them without waiting on Gemini
+            if analytics is None:
+                start_stage(db, attempt_id, "heuristics")
+                error = None
+                try:
+                    analytics_data = analyze_speech(transcript_text, word_timestamps, duration)
+                except Exception as e:
+                    logger.exception("Heuristic analytics failed for attempt %d", attempt_id)
+                    analytics_data = {}
+                    error = str(e)
+                analytics = Analytics(
+                    attempt_id=attempt_id,
+                    heuristics_version=None if error else HEURISTICS_VERSION,
+                    **analytics_data,
+                )
+                db.add(analytics)
+                record_analytics(db, analytics_data)
+                bump_question(db, attempt.question_id)
+                finish_stage(db, attempt_id, "heuristics", error)
+                _publish(db, attempt_id, "heuristics")
 
-            # Merge heuristic + LLM data
-            if llm_data:
-                analytics_data.update(llm_data)
+            if combined_future is not None:
+                try:
+                    llm_data, coaching = combined_future.result()
+                    llm_future = _resolved(llm_data)
+                    coaching_future = _resolved(coaching)
+                    llm_version = coaching_version = COMBINED_PROMPT_VERSION
+                except Exception:
+                    logger.exception(
+                        "Combined LLM analysis failed for attempt %d; falling back to separate calls",
+                        attempt_id,
+                    )
+                    llm_future = executor.submit(analyze_speech_with_llm, transcript_text)
+                    coaching_future = executor.submit(
+                        get_coaching_feedback, question_text, transcript_text
+                    )
 
-            analytics = Analytics(attempt_id=attempt_id, **analytics_data)
-            db.add(analytics)
-            db.commit()
+            # Add the LLM scores to the stored analytics
+            if llm_future is not None:
+                error = None
+                try:
+                    llm_data = llm_future.result()
+                except Exception as e:
+                    logger.exception("LLM analytics failed for attempt %d", attempt_id)
+                    llm_data = None
+                    error = str(e)
+                if llm_data is None and error is None:
+                    # analyze_speech_with_llm logs its own failure and returns None
+                    error = "LLM analytics unavailable"
+                for column, value in (llm_data or {}).items():
+                    setattr(analytics, column, value)
+                if llm_data:
+                    analytics.llm_version = llm_version
+                bump_question(db, attempt.question_id)
+                finish_stage(db, attempt_id, "llm_analytics", error)
+                _publish(db, attempt_id, "llm_analytics")
 
             # Collect coaching results
+            error = None
             try:
                 feedback_text, star_scores = coaching_future.result()
-            except Exception:
+            except Exception as e:
                 logger.exception("Coaching feedback failed for attempt %d", attempt_id)
                 feedback_text = "Coaching feedback generation failed. Please try again by re-recording."
                 star_scores = None
+                error = str(e)
 
             feedback = Feedback(
                 attempt_id=attempt_id,
                 coach_feedback=feedback_text,
                 star_scores=star_scores,
+                prompt_version=None if error else coaching_version,
             )
             db.add(feedback)
-            db.commit()
+            bump_question(db, attempt.question_id)
+            finish_stage(db, attempt_id, "coaching", error)
+            _publish(db, attempt_id, "coaching")
     except Exception:
-        logger.exception("Analysis failed for attempt %d", attempt_id)
         db.rollback()
-        # Store error as feedback so the frontend knows analysis failed
-        try:
-            existing_feedback = db.query(Feedback).filter_by(attempt_id=attempt_id).first()
-            if not existing_feedback:
-                error_feedback = Feedback(
-                    attempt_id=attempt_id,
-                    coach_feedback="Analysis failed. Please try again by re-recording.",
-                    star_scores=None,
-                )
-                db.add(error_feedback)
-                db.commit()
-        except Exception:
-            logger.exception("Failed to store error feedback for attempt %d", attempt_id)
+        raise
+    finally:
+        db.close()
+
+
+def record_analysis_failure(attempt_id: int):
+    """Store an error as feedback so the frontend knows analysis failed for good."""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        existing_feedback = db.query(Feedback).filter_by(attempt_id=attempt_id).first()
+        if not existing_feedback:
+            error_feedback = Feedback(
+                attempt_id=attempt_id,
+                coach_feedback="Analysis failed. Please try again by re-recording.",
+                star_scores=None,
+            )
+            db.add(error_feedback)
+            attempt = db.get(Attempt, attempt_id)
+            if attempt:
+                bump_question(db, attempt.question_id)
+            db.commit()
+        abandon_stages(db, attempt_id, "Analysis job failed")
+        _publish(db, attempt_id, "coaching")
+    except Exception:
+        logger.exception("Failed to store error feedback for attempt %d", attempt_id)
     finally:
         db.close()
 
 
 @router.post("/analyze/{attempt_id}")
-def trigger_analysis(
-    attempt_id: int,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-):
+def trigger_analysis(attempt_id: int, profile_job: bool = False, db: Session = Depends(get_db)):
     attempt = db.get(Attempt, attempt_id)
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
@@ -119,39 +265,125 @@ def trigger_analysis(
     if existing:
         raise HTTPException(status_code=400, detail="Already analyzed")
 
-    background_tasks.add_task(run_analysis, attempt_id)
-    return {"status": "processing", "attempt_id": attempt_id}
+    job = enqueue_analysis(db, attempt_id, profile=profile_job and PROFILING_ENABLED)
+    return {"status": "processing", "attempt_id": attempt_id, "job_id": job.id}
+
+
+@router.get("/analyze/queue")
+def analysis_queue(db: Session = Depends(get_db)):
+    return {
+        "jobs": queue_stats(db),
+        "transcription": engine_stats(),
+        "llm": gateway_stats(),
+        "llm_cache": cache_stats(),
+        "events": events.hub.stats(),
+        "http_cache": http_cache_stats(),
+        "retention": retention_stats(),
+    }
+
+
+@router.get("/analyze/slowest")
+def slowest_analyses(
+    stage: str | None = None,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """Attempts whose analysis took longest, overall or in one stage."""
+    if stage is not None and stage not in STAGES:
+        raise HTTPException(status_code=400, detail=f"stage must be one of {', '.join(STAGES)}")
+
+    timed = AnalysisStage.started_at.isnot(None), AnalysisStage.finished_at.isnot(None)
+    if stage:
+        seconds = AnalysisStage.finished_at - AnalysisStage.started_at
+        query = db.query(AnalysisStage.attempt_id, seconds).filter(AnalysisStage.stage == stage, *timed)
+    else:
+        seconds = sa_func.max(AnalysisStage.finished_at) - sa_func.min(AnalysisStage.started_at)
+        query = db.query(AnalysisStage.attempt_id, seconds).filter(*timed).group_by(AnalysisStage.attempt_id)
+    rows = query.order_by(seconds.desc()).limit(limit).all()
+    return [{"attempt_id": attempt_id, "seconds": round(value, 3)} for attempt_id, value in rows]
+
+
+@router.get("/analyze/{attempt_id}/timings")
+def analysis_timings(attempt_id: int, db: Session = Depends(get_db)):
+    """When each stage of an attempt's analysis ran and how long it took."""
+    if not db.get(Attempt, attempt_id):
+        raise HTTPException(status_code=404, detail="Attempt not found")
+
+    stages = stage_timings(db, attempt_id)
+    started = [s["started_at"] for s in stages.values() if s["started_at"] is not None]
+    finished = [s["finished_at"] for s in stages.values() if s["finished_at"] is not None]
+    total = round(max(finished) - min(started), 3) if started and finished else None
+    return {"attempt_id": attempt_id, "total_seconds": total, "stages": stages}
 
 
 @router.get("/analyze/{attempt_id}/status")
-def analysis_status(attempt_id: int, db: Session = Depends(get_db)):
+def analysis_status(
+    attempt_id: int,
+    word_timestamps: bool = False,
+    db: Session = Depends(get_db),
+):
     attempt = db.get(Attempt, attempt_id)
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
 
-    transcription = db.query(Transcription).filter_by(attempt_id=attempt_id).first()
-    analytics = db.query(Analytics).filter_by(attempt_id=attempt_id).first()
-    feedback = db.query(Feedback).filter_by(attempt_id=attempt_id).first()
+    return _status_document(db, attempt_id, word_timestamps)
 
-    if feedback:
-        status = "complete"
-    elif analytics:
-        status = "feedback_pending"
-    elif transcription:
-        status = "analytics_pending"
-    else:
-        status = "transcribing"
 
-    result = {
-        "status": status,
-        "attempt_id": attempt_id,
-    }
+def _load_snapshot(attempt_id: int) -> dict | None:
+    from database import SessionLocal
 
-    if transcription:
-        result["transcription"] = TranscriptionOut.model_validate(transcription)
-    if analytics:
-        result["analytics"] = AnalyticsOut.model_validate(analytics)
-    if feedback:
-        result["feedback"] = FeedbackOut.model_validate(feedback)
+    db = SessionLocal()
+    try:
+        if db.get(Attempt, attempt_id) is None:
+            return None
+        return jsonable_encoder(_status_document(db, attempt_id))
+    finally:
+        db.close()
 
-    return result
+
+def _sse(event: str, event_id: int, payload: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@router.get("/analyze/{attempt_id}/events")
+async def analysis_events(attempt_id: int, request: Request):
+    """Server-Sent Events stream of analysis progress.
+
+    Sends a ``status`` event with the current state, then one event per pipeline stage
+    (``transcription``, ``heuristics``, ``llm_analytics``, ``coaching``) as it is
+    committed, each carrying the full status document. The stream ends once the status is ``complete``.
+    """
+    loop = asyncio.get_running_loop()
+    subscription = await run_in_threadpool(events.hub.subscribe, attempt_id, loop, _load_snapshot)
+    if subscription.snapshot is None:
+        events.hub.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Attempt not found")
+
+    async def stream():
+        try:
+            snapshot = subscription.snapshot
+            yield _sse("status", subscription.snapshot_id, snapshot)
+            if snapshot["status"] == "complete":
+                return
+            while True:
+                try:
+                    event_id, event, payload = await asyncio.wait_for(
+                        subscription.queue.get(), KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event, event_id, payload)
+                if payload["status"] == "complete":
+                    return
+        finally:
+            events.hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
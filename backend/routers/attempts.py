@@ -1,50 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import and_, exists, or_
 from sqlalchemy.orm import Session, joinedload
 
-from database import get_db, Attempt, Question
+from database import get_db, Attempt, Question, Transcription, Feedback
 from models import AttemptDetailOut, AttemptOut, TranscriptionOut, FeedbackOut, AnalyticsOut, ProgressOut
+from services.pagination import DEFAULT_LIMIT, MAX_LIMIT, decode_cursor, encode_cursor, parse_fields
 from services.progress import compute_progress
 
 router = APIRouter()
 
+ATTEMPT_SECTIONS = {"transcription", "analytics", "feedback"}
+
+
+def _detail(a: Attempt, sections: set[str], analyzed: bool, word_timestamps: bool) -> AttemptDetailOut:
+    return AttemptDetailOut(
+        attempt=AttemptOut.model_validate(a),
+        analyzed=analyzed,
+        transcription=(
+            TranscriptionOut.from_row(a.transcription, word_timestamps)
+            if "transcription" in sections and a.transcription else None
+        ),
+        feedback=(
+            FeedbackOut.model_validate(a.feedback)
+            if "feedback" in sections and a.feedback else None
+        ),
+        analytics=(
+            AnalyticsOut.model_validate(a.analytics)
+            if "analytics" in sections and a.analytics else None
+        ),
+    )
+
 
 @router.get("/attempts/{question_id}", response_model=list[AttemptDetailOut])
-def list_attempts(question_id: int, db: Session = Depends(get_db)):
+def list_attempts(
+    question_id: int,
+    response: Response,
+    fields: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str | None = None,
+    word_timestamps: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Attempts for a question, newest first, one page at a time.
+
+    By default only the attempt rows and an `analyzed` flag are returned; `fields` adds
+    any of transcription, analytics and feedback. Full details for one attempt come from
+    GET /attempts/{question_id}/{attempt_id}. The cursor for the next page is returned
+    in the X-Next-Cursor header.
+    """
     question = db.get(Question, question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    attempts = (
-        db.query(Attempt)
-        .options(
-            joinedload(Attempt.transcription),
-            joinedload(Attempt.feedback),
-            joinedload(Attempt.analytics),
-        )
+    sections = parse_fields(fields, ATTEMPT_SECTIONS, default=set())
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    analyzed = exists().where(Feedback.attempt_id == Attempt.id).label("analyzed")
+    options = []
+    if "transcription" in sections:
+        transcription_load = joinedload(Attempt.transcription)
+        if not word_timestamps:
+            transcription_load = transcription_load.defer(Transcription.word_timestamps).defer(
+                Transcription.word_timestamps_blob
+            )
+        options.append(transcription_load)
+    if "feedback" in sections:
+        options.append(joinedload(Attempt.feedback))
+    if "analytics" in sections:
+        options.append(joinedload(Attempt.analytics))
+
+    query = (
+        db.query(Attempt, analyzed)
+        .options(*options)
         .filter(Attempt.question_id == question_id)
-        .order_by(Attempt.attempt_number.desc())
+    )
+    if cursor:
+        attempt_number, attempt_id = decode_cursor(cursor, int, int)
+        query = query.filter(or_(
+            Attempt.attempt_number < attempt_number,
+            and_(Attempt.attempt_number == attempt_number, Attempt.id < attempt_id),
+        ))
+    rows = (
+        query.order_by(Attempt.attempt_number.desc(), Attempt.id.desc())
+        .limit(limit + 1)
         .all()
     )
 
-    results = []
-    for a in attempts:
-        detail = AttemptDetailOut(
-            attempt=AttemptOut.model_validate(a),
-            transcription=(
-                TranscriptionOut.model_validate(a.transcription) if a.transcription else None
-            ),
-            feedback=(
-                FeedbackOut.model_validate(a.feedback) if a.feedback else None
-            ),
-            analytics=(
-                AnalyticsOut.model_validate(a.analytics) if a.analytics else None
-            ),
-        )
-        results.append(detail)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.attempt_number, last.id)
 
-    return results
+    return [_detail(a, sections, bool(is_analyzed), word_timestamps) for a, is_analyzed in rows]
 
 
 @router.get("/attempts/{question_id}/progress", response_model=ProgressOut)
 def get_progress(question_id: int, db: Session = Depends(get_db)):
     return compute_progress(question_id, db)
+
+
+@router.get("/attempts/{question_id}/{attempt_id}", response_model=AttemptDetailOut)
+def get_attempt(
+    question_id: int,
+    attempt_id: int,
+    word_timestamps: bool = False,
+    db: Session = Depends(get_db),
+):
+    """One attempt with its transcript, analytics and full coaching feedback."""
+    transcription_load = joinedload(Attempt.transcription)
+    if not word_timestamps:
+        transcription_load = transcription_load.defer(Transcription.word_timestamps).defer(
+            Transcription.word_timestamps_blob
+        )
+    attempt = (
+        db.query(Attempt)
+        .options(transcription_load, joinedload(Attempt.feedback), joinedload(Attempt.analytics))
+        .filter(Attempt.id == attempt_id, Attempt.question_id == question_id)
+        .first()
+    )
+    if not attempt:
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    return _detail(attempt, ATTEMPT_SECTIONS, attempt.feedback is not None, word_timestamps)
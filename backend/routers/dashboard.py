@@ -1,54 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
 from fastapi import APIRouter, Depends
 from sqlalchemy import func as sa_func
 from sqlalchemy.orm import Session
 
-from database import get_db, Attempt, Analytics, Question
+from database import get_db, DashboardRollup, DailyActivity, Question
 from models import DashboardOut
+from services.rollups import ROLLUP_ID
 
 router = APIRouter()
 
+# The streak calendar shows 20 weeks; a year leaves room without reading all of history
+ACTIVITY_DAYS = 366
+
+
+def _average(total: float, count: int) -> float | None:
+    return round(total / count, 1) if count else None
+
 
 @router.get("/dashboard", response_model=DashboardOut)
 def get_dashboard(db: Session = Depends(get_db)):
-    total_attempts = db.query(sa_func.count(Attempt.id)).scalar() or 0
-    questions_practiced = (
-        db.query(sa_func.count(sa_func.distinct(Attempt.question_id))).scalar() or 0
+    # Totals are maintained incrementally by services.rollups
+    rollup = db.get(DashboardRollup, ROLLUP_ID) or DashboardRollup(
+        total_attempts=0, questions_practiced=0, total_practice_time=0,
+        clarity_sum=0, clarity_count=0, confidence_sum=0, confidence_count=0,
+        structure_sum=0, structure_count=0,
     )
     total_questions = db.query(sa_func.count(Question.id)).scalar() or 0
-    total_practice_time = (
-        db.query(sa_func.coalesce(sa_func.sum(Attempt.duration_seconds), 0)).scalar()
-    )
 
-    # Average scores across all analytics
-    avg_scores = db.query(
-        sa_func.avg(Analytics.clarity_score),
-        sa_func.avg(Analytics.confidence_score),
-        sa_func.avg(Analytics.structure_score),
-    ).first()
-    avg_clarity = round(avg_scores[0], 1) if avg_scores[0] is not None else None
-    avg_confidence = round(avg_scores[1], 1) if avg_scores[1] is not None else None
-    avg_structure = round(avg_scores[2], 1) if avg_scores[2] is not None else None
-
-    # Daily activity: count of attempts per date for streak calendar
-    # created_at is stored as text from func.now(), format: YYYY-MM-DD HH:MM:SS
+    since = (datetime.now(timezone.utc) - timedelta(days=ACTIVITY_DAYS)).strftime("%Y-%m-%d")
     daily_activity = (
-        db.query(
-            sa_func.date(Attempt.created_at).label("date"),
-            sa_func.count(Attempt.id).label("count"),
-        )
-        .group_by(sa_func.date(Attempt.created_at))
-        .order_by(sa_func.date(Attempt.created_at))
+        db.query(DailyActivity.date, DailyActivity.attempt_count)
+        .filter(DailyActivity.date >= since)
+        .order_by(DailyActivity.date)
         .all()
     )
-    activity = {str(row.date): row.count for row in daily_activity if row.date}
+    activity = {row.date: row.attempt_count for row in daily_activity if row.attempt_count}
 
     return {
-        "total_attempts": total_attempts,
-        "questions_practiced": questions_practiced,
+        "total_attempts": rollup.total_attempts,
+        "questions_practiced": rollup.questions_practiced,
         "total_questions": total_questions,
-        "total_practice_time": total_practice_time,
-        "avg_clarity": avg_clarity,
-        "avg_confidence": avg_confidence,
-        "avg_structure": avg_structure,
+        "total_practice_time": rollup.total_practice_time,
+        "avg_clarity": _average(rollup.clarity_sum, rollup.clarity_count),
+        "avg_confidence": _average(rollup.confidence_sum, rollup.confidence_count),
+        "avg_structure": _average(rollup.structure_sum, rollup.structure_count),
         "activity": activity,
     }
@@ -1,24 +1,54 @@
+import threading
+
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
-from database import get_db, Question
+from database import get_db, Question, QuestionRollup
 from models import QuestionOut
+from services.versions import QUESTIONS, read_versions
 
 router = APIRouter()
 
+# The catalog only changes when questions are seeded; attempt counts change with every
+# upload and come from the question_rollups counters instead
+_catalog_lock = threading.Lock()
+_catalog: tuple[int, list[tuple]] | None = None  # (questions version, rows)
+
+
+def _load_catalog(db: Session) -> list[tuple]:
+    global _catalog
+    (version,) = read_versions((QUESTIONS,))
+    with _catalog_lock:
+        if _catalog is not None and _catalog[0] == version:
+            return _catalog[1]
+    rows = (
+        db.query(Question.id, Question.category, Question.question_text, Question.tips)
+        .order_by(Question.id)
+        .all()
+    )
+    with _catalog_lock:
+        _catalog = (version, rows)
+    return rows
+
 
 @router.get("/questions", response_model=list[QuestionOut])
-def list_questions(db: Session = Depends(get_db)):
-    questions = db.query(Question).options(joinedload(Question.attempts)).all()
-    result = []
-    for q in questions:
-        result.append(
-            QuestionOut(
-                id=q.id,
-                category=q.category,
-                question_text=q.question_text,
-                tips=q.tips,
-                attempt_count=len(q.attempts),
-            )
+def list_questions(category: str | None = None, db: Session = Depends(get_db)):
+    catalog = _load_catalog(db)
+    if category is not None:
+        catalog = [row for row in catalog if row.category == category]
+
+    counts = db.query(QuestionRollup.question_id, QuestionRollup.attempt_count)
+    if category is not None:
+        counts = counts.filter(QuestionRollup.question_id.in_([row.id for row in catalog]))
+    attempt_counts = dict(counts.all())
+
+    return [
+        QuestionOut(
+            id=row.id,
+            category=row.category,
+            question_text=row.question_text,
+            tips=row.tips,
+            attempt_count=attempt_counts.get(row.id, 0),
         )
-    return result
+        for row in catalog
+    ]
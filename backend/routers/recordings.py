@@ -1,11 +1,30 @@
+import logging
 import os
+import time
 import uuid
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
 from sqlalchemy import func as sa_func
 from sqlalchemy.orm import Session
 
-from database import get_db, Attempt
+from database import get_db, Attempt, Question, Transcription
+from models import format_timestamp
+from services.jobs import enqueue_analysis
+from services.metrics import observe_upload
+from services.pagination import DEFAULT_LIMIT, MAX_LIMIT, decode_cursor, encode_cursor, parse_fields
+from services.rollups import record_attempt
+from services.stages import finish_stage
+from services.streaming import start_session, get_session, pop_session
+from services.uploads import (
+    MAX_CHUNK_BYTES, UploadError, cancel_upload, create_upload, finalize_upload, upload_status, write_chunk,
+)
+from services.versions import bump_question
+from services.word_timestamps import encode_words
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -21,57 +40,270 @@ async def upload_recording(
     video: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
-    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    await run_in_threadpool(os.makedirs, RECORDINGS_DIR, exist_ok=True)
 
-    # Stream upload to disk with size limit
+    # Stream upload to disk with size limit; file I/O runs off the event loop
     filename = f"{question_id}_{uuid.uuid4().hex[:8]}.webm"
     filepath = os.path.join(RECORDINGS_DIR, filename)
     total_size = 0
+    started = time.perf_counter()
 
+    f = await run_in_threadpool(open, filepath, "wb")
     try:
-        with open(filepath, "wb") as f:
-            while chunk := await video.read(1024 * 1024):
-                total_size += len(chunk)
-                if total_size > MAX_UPLOAD_BYTES:
-                    raise HTTPException(status_code=413, detail="File too large")
-                f.write(chunk)
-    except HTTPException:
-        os.unlink(filepath)
+        while chunk := await video.read(1024 * 1024):
+            total_size += len(chunk)
+            if total_size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="File too large")
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(os.unlink, filepath)
         raise
+    await run_in_threadpool(f.close)
+    observe_upload("single", total_size, time.perf_counter() - started)
+
+    attempt = await run_in_threadpool(_store_attempt, db, question_id, filename, duration_seconds, timer_setting)
+
+    return {"attempt_id": attempt.id, "attempt_number": attempt.attempt_number}
+
+
+def _store_attempt(
+    db: Session, question_id: int, filename: str, duration_seconds: float, timer_setting: int
+) -> Attempt:
+    attempt = _add_attempt(db, question_id, filename, duration_seconds, timer_setting)
+    db.commit()
+    db.refresh(attempt)
+    return attempt
 
+
+def _add_attempt(
+    db: Session, question_id: int, filename: str, duration_seconds: float, timer_setting: int
+) -> Attempt:
     # Use MAX to avoid race condition on attempt_number
     max_num = (
         db.query(sa_func.coalesce(sa_func.max(Attempt.attempt_number), 0))
         .filter(Attempt.question_id == question_id)
         .scalar()
     )
-    attempt_number = max_num + 1
-
     attempt = Attempt(
         question_id=question_id,
-        attempt_number=attempt_number,
+        attempt_number=max_num + 1,
         video_path=filename,
         duration_seconds=duration_seconds,
         timer_setting=timer_setting,
     )
     db.add(attempt)
+    db.flush()
+    record_attempt(db, question_id, duration_seconds)
+    bump_question(db, question_id)
+    return attempt
+
+
+@router.post("/recordings/stream")
+def start_streaming_upload(
+    question_id: int = Form(...),
+    timer_setting: int = Form(120),
+    db: Session = Depends(get_db),
+):
+    """Open a streaming upload. Chunks are transcribed as they arrive."""
+    if not db.get(Question, question_id):
+        raise HTTPException(status_code=404, detail="Question not found")
+    session = start_session(question_id, timer_setting)
+    return {"upload_id": session.upload_id}
+
+
+@router.post("/recordings/stream/{upload_id}/chunks")
+async def append_streaming_chunk(upload_id: str, request: Request):
+    session = get_session(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    started = time.perf_counter()
+    data = await request.body()
+    if session.bytes_received + len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+    await run_in_threadpool(session.append, data)
+    observe_upload("stream", len(data), time.perf_counter() - started)
+    return {
+        "bytes_received": session.bytes_received,
+        "transcribed_seconds": round(session.committed_until, 1),
+    }
+
+
+@router.post("/recordings/stream/{upload_id}/finish")
+def finish_streaming_upload(
+    upload_id: str,
+    duration_seconds: float = Form(0),
+    db: Session = Depends(get_db),
+):
+    """Close a streaming upload, store the attempt with its transcript and queue the rest of the analysis."""
+    session = pop_session(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    try:
+        transcript = session.finish()
+    except Exception:
+        # The analysis job transcribes the whole file instead
+        logger.exception("Could not finish streaming transcription for upload %s", upload_id)
+        transcript = None
+
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    filename = f"{session.question_id}_{uuid.uuid4().hex[:8]}.webm"
+    os.replace(session.path, os.path.join(RECORDINGS_DIR, filename))
+
+    attempt = _add_attempt(db, session.question_id, filename, duration_seconds, session.timer_setting)
+    if transcript is not None:
+        transcript_text, words = transcript
+        db.add(Transcription(
+            attempt_id=attempt.id,
+            transcript_text=transcript_text,
+            word_timestamps_blob=encode_words(words),
+        ))
+        finish_stage(db, attempt.id, "transcription")
     db.commit()
     db.refresh(attempt)
+    enqueue_analysis(db, attempt.id)
+
+    return {
+        "attempt_id": attempt.id,
+        "attempt_number": attempt.attempt_number,
+        "status": "processing",
+    }
+
+
+def _upload_error(e: UploadError) -> HTTPException:
+    headers = {"X-Upload-Offset": str(e.offset)} if e.offset is not None else None
+    return HTTPException(status_code=e.status, detail=str(e), headers=headers)
 
-    return {"attempt_id": attempt.id, "attempt_number": attempt_number}
+
+@router.post("/recordings/uploads")
+def start_resumable_upload(
+    question_id: int = Form(...),
+    size: int = Form(...),
+    timer_setting: int = Form(120),
+    db: Session = Depends(get_db),
+):
+    """Open a resumable upload of `size` bytes. Send it with PUT .../uploads/{upload_id}."""
+    if not db.get(Question, question_id):
+        raise HTTPException(status_code=404, detail="Question not found")
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="Upload size must be positive")
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+    upload = create_upload(question_id, timer_setting, size)
+    return {key: upload[key] for key in ("upload_id", "offset", "size", "chunk_size")}
+
+
+@router.get("/recordings/uploads/{upload_id}")
+def get_resumable_upload(upload_id: str):
+    """How many bytes have been received, i.e. where to resume."""
+    upload = upload_status(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {key: upload[key] for key in ("upload_id", "offset", "size", "chunk_size")}
+
+
+@router.put("/recordings/uploads/{upload_id}")
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int,
+    x_chunk_sha256: str = Header(...),
+):
+    """Store the request body at `offset`. The X-Chunk-SHA256 header is its hex SHA-256.
+
+    A 409 answer carries the offset to resume from in the X-Upload-Offset header.
+    """
+    started = time.perf_counter()
+    data = bytearray()
+    async for piece in request.stream():
+        data += piece
+        if len(data) > MAX_CHUNK_BYTES:
+            raise HTTPException(status_code=413, detail="Chunk too large")
+    try:
+        new_offset = await run_in_threadpool(write_chunk, upload_id, offset, bytes(data), x_chunk_sha256)
+    except UploadError as e:
+        raise _upload_error(e)
+    observe_upload("resumable", len(data), time.perf_counter() - started)
+    return {"upload_id": upload_id, "offset": new_offset}
+
+
+@router.post("/recordings/uploads/{upload_id}/finalize")
+def finalize_resumable_upload(
+    upload_id: str,
+    duration_seconds: float = Form(0),
+    db: Session = Depends(get_db),
+):
+    """Turn a fully received upload into an attempt."""
+    upload = upload_status(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    filename = f"{upload['question_id']}_{uuid.uuid4().hex[:8]}.webm"
+    try:
+        finalize_upload(upload_id, os.path.join(RECORDINGS_DIR, filename))
+    except UploadError as e:
+        raise _upload_error(e)
+
+    attempt = _store_attempt(db, upload["question_id"], filename, duration_seconds, upload["timer_setting"])
+    return {"attempt_id": attempt.id, "attempt_number": attempt.attempt_number}
+
+
+@router.delete("/recordings/uploads/{upload_id}")
+def cancel_resumable_upload(upload_id: str):
+    if not cancel_upload(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"status": "cancelled"}
+
+
+RECORDING_FIELDS = ("question_id", "attempt_number", "video_path", "duration_seconds", "created_at")
 
 
 @router.get("/recordings")
-def list_recordings(db: Session = Depends(get_db)):
-    attempts = db.query(Attempt).order_by(Attempt.created_at.desc()).all()
-    return [
-        {
-            "id": a.id,
-            "question_id": a.question_id,
-            "attempt_number": a.attempt_number,
-            "video_path": a.video_path,
-            "duration_seconds": a.duration_seconds,
-            "created_at": a.created_at,
-        }
-        for a in attempts
+def list_recordings(
+    response: Response,
+    fields: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """All recordings, newest first, one page at a time.
+
+    `fields` restricts the returned (and loaded) columns; `id` is always included. The
+    cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    selected = parse_fields(fields, set(RECORDING_FIELDS), set(RECORDING_FIELDS))
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    columns = [Attempt.id, Attempt.created_at] + [
+        getattr(Attempt, name) for name in sorted(selected - {"created_at"})
     ]
+    query = db.query(*columns)
+    if cursor:
+        created_at, attempt_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(or_(
+            Attempt.created_at < created_at,
+            and_(Attempt.created_at == created_at, Attempt.id < attempt_id),
+        ))
+    rows = (
+        query.order_by(Attempt.created_at.desc(), Attempt.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at.isoformat(), last.id)
+
+    recordings = []
+    for row in rows:
+        recording = {"id": row.id}
+        for name in RECORDING_FIELDS:
+            if name in selected:
+                value = getattr(row, name)
+                recording[name] = format_timestamp(value) if name == "created_at" else value
+        recordings.append(recording)
+    return recordings
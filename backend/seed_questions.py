@@ -1,42 +1,52 @@
 from database import SessionLocal, Question
+from services.versions import QUESTIONS, bump
 
+# "key" identifies a built-in question across edits to its wording; never change one
 SEED_QUESTIONS = [
     {
+        "key": "conflict",
         "category": "Conflict",
         "question_text": "Tell me about a time you had a disagreement with a teammate about a technical decision. How did you handle it?",
         "tips": "Focus on the specific technical disagreement, how you listened to the other perspective, and how you reached a resolution. Highlight collaboration over winning.",
     },
     {
+        "key": "learning",
         "category": "Learning",
         "question_text": "Describe a project where you had to learn a new technology quickly. How did you approach it?",
         "tips": "Describe your learning strategy, resources you used, and how you applied the new knowledge. Show intellectual curiosity and self-direction.",
     },
     {
+        "key": "failure",
         "category": "Failure",
         "question_text": "Tell me about a time you missed a deadline or a project didn't go as planned. What happened?",
         "tips": "Be honest about what went wrong. Focus on what you learned and how you prevented similar issues in the future. Show accountability.",
     },
     {
+        "key": "leadership",
         "category": "Leadership",
         "question_text": "Describe a situation where you had to lead a project or initiative. What was the outcome?",
         "tips": "Highlight how you motivated others, made decisions, and handled obstacles. Quantify the outcome if possible.",
     },
     {
+        "key": "technical",
         "category": "Technical",
         "question_text": "Tell me about a time you had to debug a particularly challenging production issue.",
         "tips": "Walk through your debugging process step by step. Highlight tools you used, how you narrowed down the issue, and how you communicated with stakeholders.",
     },
     {
+        "key": "trade-offs",
         "category": "Trade-offs",
         "question_text": "Describe a situation where you had to make a trade-off between speed and quality.",
         "tips": "Explain the context and constraints. Show your decision-making framework and how you communicated the trade-off to stakeholders.",
     },
     {
+        "key": "growth",
         "category": "Growth",
         "question_text": "Tell me about a time you received critical feedback. How did you respond?",
         "tips": "Show that you can receive feedback gracefully. Describe the specific changes you made as a result. Demonstrate growth mindset.",
     },
     {
+        "key": "impact",
         "category": "Impact",
         "question_text": "Describe a project you're most proud of. What was your specific contribution?",
         "tips": "Be specific about YOUR contribution vs. the team's. Quantify impact where possible. Show passion and ownership.",
@@ -44,14 +54,51 @@ SEED_QUESTIONS = [
 ]
 
 
+def _match(q: dict, keyed: dict, unkeyed: list) -> Question | None:
+    row = keyed.get(q["key"])
+    if row is not None:
+        return row
+    # Rows seeded before keys existed: claim the one with the same text, or the only
+    # one in the same category if the text has been edited since
+    for candidates in (
+        [r for r in unkeyed if r.question_text == q["question_text"]],
+        [r for r in unkeyed if r.category == q["category"]],
+    ):
+        if len(candidates) == 1:
+            unkeyed.remove(candidates[0])
+            return candidates[0]
+    return None
+
+
 def seed():
+    """Insert missing built-in questions and refresh edited ones.
+
+    Questions are matched by their seed key, so rewording a question updates it in
+    place. When everything already matches, nothing is written, so a normal boot costs
+    a single read.
+    """
     db = SessionLocal()
     try:
-        if db.query(Question).count() == 0:
-            for q in SEED_QUESTIONS:
-                db.add(Question(**q))
+        rows = db.query(Question).all()
+        keyed = {row.seed_key: row for row in rows if row.seed_key}
+        unkeyed = [row for row in rows if not row.seed_key]
+        changed = 0
+        for q in SEED_QUESTIONS:
+            values = {"seed_key": q["key"], "category": q["category"],
+                      "question_text": q["question_text"], "tips": q["tips"]}
+            row = _match(q, keyed, unkeyed)
+            if row is None:
+                db.add(Question(**values))
+            elif any(getattr(row, name) != value for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(row, name, value)
+            else:
+                continue
+            changed += 1
+        if changed:
+            bump(db, QUESTIONS)
             db.commit()
-            print(f"Seeded {len(SEED_QUESTIONS)} questions.")
+            print(f"Seeded {changed} questions.")
         else:
             print("Questions already seeded.")
     finally:
@@ -0,0 +1,122 @@
+"""Speech-recognition backends.
+
+Each backend turns an audio source into ``(transcript_text, words)`` where ``words`` is a
+list of ``{"word", "start", "end"}`` dicts. ``get_backend`` picks one by config:
+
+- ``whisper``: openai-whisper in fp32 (the original pipeline)
+- ``faster-whisper``: CTranslate2 with int8 weights, much cheaper on CPU-only hosts
+"""
+import os
+import threading
+import warnings
+from abc import ABC, abstractmethod
+
+ASR_BACKEND = os.environ.get("STARCOACH_ASR_BACKEND", "whisper")
+ASR_MODEL = os.environ.get("STARCOACH_ASR_MODEL", "small")
+ASR_COMPUTE_TYPE = os.environ.get("STARCOACH_ASR_COMPUTE_TYPE", "int8")
+
+INITIAL_PROMPT = "Include filler words like um, uh, you know, I mean, like, actually, basically."
+
+
+def _format_words(raw_words) -> list[dict]:
+    """Normalize (word, start, end) triples into the stored word timestamp shape."""
+    return [
+        {"word": word.strip(), "start": round(start, 2), "end": round(end, 2)}
+        for word, start, end in raw_words
+    ]
+
+
+class ASRBackend(ABC):
+    name = ""
+
+    def __init__(self, model_name: str = ASR_MODEL, threads: int = 0):
+        self.model_name = model_name
+        self.threads = threads  # 0 lets the library decide
+        self._model = None
+
+    def load(self):
+        """Load the model if it isn't loaded yet. Safe to call repeatedly."""
+        if self._model is None:
+            self._model = self._load_model()
+        return self._model
+
+    @abstractmethod
+    def _load_model(self):
+        """Import the library and return a loaded model."""
+
+    @abstractmethod
+    def transcribe(self, audio) -> tuple[str, list[dict]]:
+        """Transcribe a file path or 16 kHz mono float32 array."""
+
+
+class WhisperBackend(ASRBackend):
+    name = "whisper"
+
+    def _load_model(self):
+        import whisper
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        return whisper.load_model(self.model_name)
+
+    def transcribe(self, audio) -> tuple[str, list[dict]]:
+        with warnings.catch_warnings():
+            # torch warns when wrapping the read-only memory-mapped audio cache; it never writes to it
+            warnings.filterwarnings("ignore", message="The given NumPy array is not writable")
+            result = self.load().transcribe(audio, word_timestamps=True, initial_prompt=INITIAL_PROMPT)
+        words = _format_words(
+            (w["word"], w["start"], w["end"])
+            for segment in result.get("segments", [])
+            for w in segment.get("words", [])
+        )
+        return result.get("text", "").strip(), words
+
+
+class FasterWhisperBackend(ASRBackend):
+    name = "faster-whisper"
+
+    def __init__(self, model_name: str = ASR_MODEL, threads: int = 0, compute_type: str = ASR_COMPUTE_TYPE):
+        super().__init__(model_name, threads)
+        self.compute_type = compute_type
+
+    def _load_model(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "STARCOACH_ASR_BACKEND=faster-whisper needs the optional dependency: uv sync --extra fast"
+            ) from e
+        return WhisperModel(
+            self.model_name, device="cpu", compute_type=self.compute_type, cpu_threads=self.threads
+        )
+
+    def transcribe(self, audio) -> tuple[str, list[dict]]:
+        segments, _info = self.load().transcribe(
+            audio, word_timestamps=True, initial_prompt=INITIAL_PROMPT
+        )
+        text_parts = []
+        raw_words = []
+        # segments is a lazy generator; decoding happens while iterating
+        for segment in segments:
+            text_parts.append(segment.text)
+            raw_words.extend((w.word, w.start, w.end) for w in segment.words or [])
+        return "".join(text_parts).strip(), _format_words(raw_words)
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+_backends: dict[str, ASRBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = ASR_BACKEND, threads: int = 0) -> ASRBackend:
+    """Return the process-wide instance of the named backend."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend {name!r}; expected one of {sorted(BACKENDS)}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name](threads=threads)
+        return _backends[name]
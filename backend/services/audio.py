@@ -0,0 +1,81 @@
+"""Decode-once audio cache.
+
+The first time an attempt's audio is needed, ffmpeg extracts the soundtrack from the
+``.webm`` into mono 16 kHz float32 PCM stored next to the recording (``<stem>.16k.f32``,
+raw little-endian samples, no header). Every later reader memory-maps that file, so
+re-transcription and other audio analysis never decode the video again and pool
+processes share the same pages instead of each holding a copy.
+"""
+import os
+import subprocess
+import uuid
+
+import numpy as np
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "recordings")
+
+SAMPLE_RATE = 16000
+PCM_SUFFIX = ".16k.f32"
+
+
+def recording_path(video_filename: str) -> str:
+    # Prevent path traversal by using only the basename
+    return os.path.join(RECORDINGS_DIR, os.path.basename(video_filename))
+
+
+def audio_cache_path(video_filename: str) -> str:
+    stem, _ext = os.path.splitext(os.path.basename(video_filename))
+    return os.path.join(RECORDINGS_DIR, stem + PCM_SUFFIX)
+
+
+def extract_audio(video_filename: str) -> str:
+    """Make sure the PCM cache for a recording exists. Returns its path."""
+    cache_path = audio_cache_path(video_filename)
+    if os.path.exists(cache_path):
+        return cache_path
+
+    # Decode to a private temp file and rename, so concurrent extractions never
+    # expose a half-written cache
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex[:8]}.tmp"
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-i", recording_path(video_filename),
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "f32le", tmp_path,
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        os.replace(tmp_path, cache_path)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to extract audio: {e.stderr.decode(errors='replace')}") from e
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return cache_path
+
+
+def load_audio(video_filename: str) -> np.ndarray:
+    """Return the recording's audio as a read-only memory-mapped float32 array."""
+    cache_path = extract_audio(video_filename)
+    if os.path.getsize(cache_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(cache_path, dtype="<f4", mode="r")
+
+
+def decode_audio(path: str, start_seconds: float = 0.0) -> np.ndarray:
+    """Decode a media file into memory as mono 16 kHz float32, starting at `start_seconds`.
+
+    Works on files that are still being written: ffmpeg decodes what is there and stops.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-ss", f"{start_seconds:.3f}", "-i", path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "f32le", "-",
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    # A truncated file makes ffmpeg exit non-zero after decoding everything it could
+    if result.returncode != 0 and not result.stdout:
+        raise RuntimeError(f"Failed to decode audio: {result.stderr.decode(errors='replace')}")
+    usable = len(result.stdout) - len(result.stdout) % 4
+    return np.frombuffer(result.stdout[:usable], dtype="<f4")
@@ -1,6 +1,7 @@
-from google import genai
 from pydantic import BaseModel, Field
 
+from services.gemini import agenerate_structured, generate_structured, prompt_version
+
 SYSTEM_PROMPT = """You are STAR Coach, a warm, encouraging, and insightful behavioral interview coach \
 for software engineers. You help candidates improve their answers using the STAR method \
 (Situation, Task, Action, Result).
@@ -33,11 +34,11 @@ class CoachingFeedback(BaseModel):
     star_scores: STARScores
 
 
-def get_coaching_feedback(question_text: str, transcript_text: str) -> tuple[str, str]:
-    """Get coaching feedback from Gemini. Returns (feedback_text, star_scores_json)."""
-    client = genai.Client()
+PROMPT_VERSION = prompt_version(SYSTEM_PROMPT, CoachingFeedback)
+
 
-    user_message = f"""Here's the behavioral interview question and the candidate's response. \
+def build_user_message(question_text: str, transcript_text: str) -> str:
+    return f"""Here's the behavioral interview question and the candidate's response. \
 Please provide coaching feedback.
 
 **Question:** {question_text}
@@ -45,18 +46,16 @@ Please provide coaching feedback.
 **Candidate's Response:**
 {transcript_text}"""
 
-    response = client.models.generate_content(
-        model="gemini-3-flash-preview",
-        contents=user_message,
-        config=genai.types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
-            response_mime_type="application/json",
-            response_json_schema=CoachingFeedback.model_json_schema(),
-        ),
-    )
 
-    if response.text is None:
-        raise ValueError("Gemini returned an empty response")
+def get_coaching_feedback(question_text: str, transcript_text: str) -> tuple[str, str]:
+    """Get coaching feedback from Gemini. Returns (feedback_text, star_scores_json)."""
+    user_message = build_user_message(question_text, transcript_text)
+    parsed = generate_structured(SYSTEM_PROMPT, CoachingFeedback, user_message)
+    return parsed.feedback_text, parsed.star_scores.model_dump_json()
+
 
-    parsed = CoachingFeedback.model_validate_json(response.text)
+async def aget_coaching_feedback(question_text: str, transcript_text: str) -> tuple[str, str]:
+    """Async variant of get_coaching_feedback for bulk callers."""
+    user_message = build_user_message(question_text, transcript_text)
+    parsed = await agenerate_structured(SYSTEM_PROMPT, CoachingFeedback, user_message)
     return parsed.feedback_text, parsed.star_scores.model_dump_json()
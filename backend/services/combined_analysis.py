@@ -0,0 +1,53 @@
+"""Single-request LLM analysis.
+
+With ``STARCOACH_LLM_MODE=combined`` one Gemini call returns both the delivery scores
+(the ``Analytics`` LLM columns) and the STAR coaching feedback (the ``Feedback`` row).
+The transcript is sent once instead of twice, roughly halving input tokens and saving a
+round trip. The two-call path in ``llm_analytics`` and ``coach`` remains the fallback.
+"""
+import os
+
+from pydantic import BaseModel
+
+from services import coach, llm_analytics
+from services.gemini import agenerate_structured, generate_structured, prompt_version
+
+LLM_MODE = os.environ.get("STARCOACH_LLM_MODE", "separate")  # "separate" | "combined"
+
+SYSTEM_PROMPT = coach.SYSTEM_PROMPT + """
+
+In the same response, also evaluate the delivery of the answer as a speech analytics \
+expert: give each metric below a score (1-5) with a brief justification.
+
+""" + llm_analytics.RUBRICS
+
+
+class CombinedAnalysis(BaseModel):
+    analytics: llm_analytics.AnalyticsResult
+    coaching: coach.CoachingFeedback
+
+
+PROMPT_VERSION = prompt_version(SYSTEM_PROMPT, CombinedAnalysis)
+
+
+def _to_results(parsed: CombinedAnalysis) -> tuple[dict, tuple[str, str]]:
+    return (
+        llm_analytics.to_columns(parsed.analytics),
+        (parsed.coaching.feedback_text, parsed.coaching.star_scores.model_dump_json()),
+    )
+
+
+def analyze_and_coach(question_text: str, transcript_text: str) -> tuple[dict, tuple[str, str]]:
+    """One Gemini call for both outputs.
+
+    Returns (llm_analytics_columns, (feedback_text, star_scores_json)).
+    """
+    user_message = coach.build_user_message(question_text, transcript_text)
+    parsed = generate_structured(SYSTEM_PROMPT, CombinedAnalysis, user_message)
+    return _to_results(parsed)
+
+
+async def aanalyze_and_coach(question_text: str, transcript_text: str) -> tuple[dict, tuple[str, str]]:
+    """Async variant of analyze_and_coach for bulk callers."""
+    user_message = coach.build_user_message(question_text, transcript_text)
+    return _to_results(await agenerate_structured(SYSTEM_PROMPT, CombinedAnalysis, user_message))
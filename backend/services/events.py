@@ -0,0 +1,189 @@
+"""Push analysis progress to connected clients.
+
+Whoever runs an analysis (an embedded worker or a standalone ``worker.py``) calls
+``publish`` after each stage commits. The payload is the full status document for the
+attempt, written to the ``analysis_events`` table so every API process can see it.
+
+Each API process has one ``EventHub``. While it has subscribers, a single tailer thread
+polls the table for new rows (one indexed query per interval, however many clients are
+connected) and fans them out to per-client asyncio queues. The latest payload for each
+watched attempt is kept in memory, so clients that connect mid-analysis are answered
+without a query.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from sqlalchemy import func as sa_func
+
+from database import SessionLocal, AnalysisEvent
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = float(os.environ.get("STARCOACH_EVENTS_POLL_SECONDS", "0.5"))
+RETENTION_SECONDS = 3600
+MAX_CACHED_ATTEMPTS = 1000
+
+
+def publish(attempt_id: int, event: str, payload: dict):
+    """Record a stage transition. Never raises: progress events must not fail an analysis."""
+    db = SessionLocal()
+    try:
+        now = time.time()
+        db.add(AnalysisEvent(
+            attempt_id=attempt_id, event=event, payload=json.dumps(payload), created_at=now,
+        ))
+        if payload.get("status") == "complete":
+            db.query(AnalysisEvent).filter(
+                AnalysisEvent.created_at < now - RETENTION_SECONDS
+            ).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        logger.exception("Failed to publish %s event for attempt %d", event, attempt_id)
+        db.rollback()
+    finally:
+        db.close()
+
+
+class Subscription:
+    def __init__(self, attempt_id: int, loop: asyncio.AbstractEventLoop):
+        self.attempt_id = attempt_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.snapshot: dict | None = None
+        self.snapshot_id = 0
+        self._loop = loop
+        self._last_id = 0
+
+    def _deliver(self, event_id: int, event: str, payload: dict):
+        # Called by the tailer with the hub lock held
+        if event_id <= self._last_id:
+            return
+        self._last_id = event_id
+        try:
+            self._loop.call_soon_threadsafe(self.queue.put_nowait, (event_id, event, payload))
+        except RuntimeError:
+            pass  # the client's event loop is gone
+
+
+class EventHub:
+    def __init__(self, poll_interval: float = POLL_SECONDS):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscription]] = {}
+        # attempt_id -> (event id, payload); only trusted while the tailer is running
+        self._latest: OrderedDict[int, tuple[int, dict]] = OrderedDict()
+        self._cursor = 0
+        self._tailer: threading.Thread | None = None
+
+    def subscribe(
+        self,
+        attempt_id: int,
+        loop: asyncio.AbstractEventLoop,
+        load_snapshot: Callable[[int], dict | None],
+    ) -> Subscription:
+        """Register a client and attach the attempt's current status as ``snapshot``.
+
+        ``load_snapshot`` reads the status from the database; it is only called when the
+        hub has nothing cached. Blocking, so call it off the event loop.
+        """
+        subscription = Subscription(attempt_id, loop)
+        with self._lock:
+            if self._tailer is None:
+                self._cursor = _max_event_id()
+                self._latest.clear()
+                self._tailer = threading.Thread(target=self._tail, name="event-tailer", daemon=True)
+                self._tailer.start()
+            self._subscribers.setdefault(attempt_id, set()).add(subscription)
+            cursor = self._cursor
+            cached = self._latest.get(attempt_id)
+
+        if cached is None:
+            # Anything committed after `cursor` reaches the subscriber as an event, so a
+            # snapshot read now can only be older than what the tailer stores later.
+            snapshot = load_snapshot(attempt_id)
+            if snapshot is not None:
+                with self._lock:
+                    cached = self._latest.setdefault(attempt_id, (cursor, snapshot))
+                    self._trim()
+
+        if cached is not None:
+            subscription.snapshot_id, subscription.snapshot = cached
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.attempt_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.attempt_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+                "attempts_watched": len(self._subscribers),
+                "tailing": self._tailer is not None,
+            }
+
+    def _trim(self):
+        while len(self._latest) > MAX_CACHED_ATTEMPTS:
+            self._latest.popitem(last=False)
+
+    def _tail(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Nothing is listening; cached state goes stale from here on
+                    self._tailer = None
+                    self._latest.clear()
+                    return
+                cursor = self._cursor
+
+            try:
+                rows = _events_after(cursor)
+            except Exception:
+                logger.exception("Failed to read analysis events")
+                rows = []
+
+            if rows:
+                with self._lock:
+                    for event_id, attempt_id, event, payload_json in rows:
+                        payload = json.loads(payload_json)
+                        self._latest[attempt_id] = (event_id, payload)
+                        self._latest.move_to_end(attempt_id)
+                        for subscription in self._subscribers.get(attempt_id, ()):
+                            subscription._deliver(event_id, event, payload)
+                    self._cursor = rows[-1][0]
+                    self._trim()
+
+            time.sleep(self.poll_interval)
+
+
+def _max_event_id() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(sa_func.max(AnalysisEvent.id)).scalar() or 0
+    finally:
+        db.close()
+
+
+def _events_after(cursor: int) -> list[tuple]:
+    db = SessionLocal()
+    try:
+        return (
+            db.query(AnalysisEvent.id, AnalysisEvent.attempt_id, AnalysisEvent.event, AnalysisEvent.payload)
+            .filter(AnalysisEvent.id > cursor)
+            .order_by(AnalysisEvent.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+hub = EventHub()
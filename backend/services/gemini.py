@@ -0,0 +1,281 @@
+"""Process-wide gateway for Gemini calls.
+
+Every LLM request in the process goes through one ``LLMGateway``: a single async
+``genai.Client`` (so HTTP connections are kept alive and reused) running on a
+dedicated event loop thread. Requests are limited by a global concurrency semaphore
+and a token-bucket rate limiter, and transient failures (429, 5xx, connection errors)
+are retried with jittered exponential backoff.
+
+Synchronous callers (analysis workers) use ``generate_structured``; async callers can
+await ``agenerate_structured``. Setting ``STARCOACH_GEMINI_BASE_URL`` points the client
+at another server, e.g. the stub in ``benchmarks/fake_gemini.py``.
+
+``google.genai`` takes about half a second to import, so it is imported when the
+gateway is first used rather than when the API starts.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import TypeVar
+
+import httpx
+from pydantic import BaseModel
+
+from services import llm_cache
+from services.metrics import LLM_FAILURES, LLM_REQUEST_SECONDS, LLM_RETRIES, register_collector
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gemini-3-flash-preview"
+
+BASE_URL = os.environ.get("STARCOACH_GEMINI_BASE_URL")
+MAX_CONCURRENCY = int(os.environ.get("STARCOACH_LLM_MAX_CONCURRENCY", "4"))
+RATE_PER_MINUTE = float(os.environ.get("STARCOACH_LLM_RATE_PER_MINUTE", "60"))
+MAX_RETRIES = int(os.environ.get("STARCOACH_LLM_MAX_RETRIES", "4"))
+RETRY_BASE_SECONDS = float(os.environ.get("STARCOACH_LLM_RETRY_BASE_SECONDS", "1"))
+TIMEOUT_SECONDS = float(os.environ.get("STARCOACH_LLM_TIMEOUT_SECONDS", "120"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`.
+
+    A rate of 0 or less means no limit.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # Reserve a token, letting the balance go negative, then wait for it outside the
+        # bookkeeping. Nothing awaits in between, so callers on the loop can't interleave
+        # and later callers queue behind earlier reservations.
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) - 1
+        self.updated = now
+        if self.tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self.tokens / self.rate)
+        except asyncio.CancelledError:
+            self.tokens += 1  # hand the reservation back
+            raise
+
+
+def _is_retryable(exc: Exception) -> bool:
+    from google.genai import errors
+
+    if isinstance(exc, errors.APIError):
+        return exc.code in RETRYABLE_STATUS
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, OSError))
+
+
+def _failure_reason(exc: Exception) -> str:
+    """A low-cardinality label for a failed request: the HTTP status or the error type."""
+    from google.genai import errors
+
+    if isinstance(exc, errors.APIError):
+        return str(exc.code)
+    if isinstance(exc, (httpx.TimeoutException, asyncio.TimeoutError)):
+        return "timeout"
+    return type(exc).__name__
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        base_url: str | None = BASE_URL,
+        max_concurrency: int = MAX_CONCURRENCY,
+        rate_per_minute: float = RATE_PER_MINUTE,
+        max_retries: int = MAX_RETRIES,
+    ):
+        from google import genai
+        from google.genai import types
+
+        http_options = types.HttpOptions(timeout=int(TIMEOUT_SECONDS * 1000))
+        if base_url:
+            http_options.base_url = base_url
+        self._client = genai.Client(http_options=http_options)
+        self.max_retries = max_retries
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+
+        async def _init_limits():
+            self._semaphore = asyncio.Semaphore(max_concurrency)
+            self._bucket = TokenBucket(rate_per_minute / 60, capacity=max_concurrency)
+
+        asyncio.run_coroutine_threadsafe(_init_limits(), self._loop).result()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    async def generate(self, model: str, system_prompt: str, json_schema: dict, user_message: str) -> str:
+        """Run one structured-output request on the gateway loop. Returns the response text."""
+        from google.genai import types
+
+        config = types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            response_mime_type="application/json",
+            response_json_schema=json_schema,
+        )
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            async with self._semaphore:
+                self._count("requests")
+                self._count("in_flight")
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    response = await self._client.aio.models.generate_content(
+                        model=model, contents=user_message, config=config
+                    )
+                except Exception as e:
+                    if attempt >= self.max_retries or not _is_retryable(e):
+                        self._count("failures")
+                        LLM_FAILURES.inc(model=model, reason=_failure_reason(e))
+                        raise
+                    outcome = "retry"
+                    error = e
+                else:
+                    if response.text is None:
+                        self._count("failures")
+                        LLM_FAILURES.inc(model=model, reason="empty")
+                        raise ValueError("Gemini returned an empty response")
+                    outcome = "ok"
+                    return response.text
+                finally:
+                    self._count("in_flight", -1)
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+            # Full jitter: sleep a random fraction of the exponential backoff, outside the semaphore
+            delay = random.uniform(0, RETRY_BASE_SECONDS * 2 ** attempt)
+            attempt += 1
+            self._count("retries")
+            LLM_RETRIES.inc(model=model)
+            logger.warning("Gemini request failed (%s); retry %d in %.1fs", error, attempt, delay)
+            await asyncio.sleep(delay)
+
+    def submit(self, model: str, system_prompt: str, json_schema: dict, user_message: str) -> Future:
+        """Schedule a request from any thread. Returns a concurrent Future with the response text."""
+        return asyncio.run_coroutine_threadsafe(
+            self.generate(model, system_prompt, json_schema, user_message), self._loop
+        )
+
+    def close(self):
+        async def _close():
+            await self._client.aio.aclose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), self._loop).result(timeout=5)
+        except Exception:
+            logger.exception("Failed to close Gemini client")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_gateway: LLMGateway | None = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
+
+
+def shutdown_gateway():
+    global _gateway
+    with _gateway_lock:
+        if _gateway is not None:
+            _gateway.close()
+            _gateway = None
+
+
+def gateway_stats() -> dict:
+    with _gateway_lock:
+        gateway = _gateway
+    return gateway.stats() if gateway else {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0}
+
+
+def _collect_metrics():
+    yield "starcoach_llm_in_flight", "Gemini requests in flight", "gauge", [({}, gateway_stats()["in_flight"])]
+
+
+register_collector(_collect_metrics)
+
+
+def prompt_version(system_prompt: str, schema: type[BaseModel], model: str = MODEL) -> str:
+    """Identify a prompt. Stored with LLM results so stale rows can be found and redone."""
+    payload = json.dumps(
+        [model, system_prompt, schema.model_json_schema()], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def generate_structured(
+    system_prompt: str, schema: type[T], user_message: str, model: str = MODEL
+) -> T:
+    """Ask Gemini for a JSON response matching `schema`, answering repeats from the cache.
+
+    Only responses that validate against the schema are cached.
+    """
+    json_schema = schema.model_json_schema()
+    key = llm_cache.cache_key(model, system_prompt, json_schema, user_message)
+
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return schema.model_validate_json(cached)
+
+    response_text = get_gateway().submit(model, system_prompt, json_schema, user_message).result()
+    parsed = schema.model_validate_json(response_text)
+    llm_cache.put(key, model, response_text)
+    return parsed
+
+
+async def agenerate_structured(
+    system_prompt: str, schema: type[T], user_message: str, model: str = MODEL
+) -> T:
+    """Async variant of generate_structured for callers running their own event loop.
+
+    No thread is held while the request is in flight, so many can be awaited at once;
+    the gateway's limits still apply.
+    """
+    json_schema = schema.model_json_schema()
+    key = llm_cache.cache_key(model, system_prompt, json_schema, user_message)
+
+    cached = await asyncio.to_thread(llm_cache.get, key)
+    if cached is not None:
+        return schema.model_validate_json(cached)
+
+    future = get_gateway().submit(model, system_prompt, json_schema, user_message)
+    response_text = await asyncio.wrap_future(future)
+    parsed = schema.model_validate_json(response_text)
+    await asyncio.to_thread(llm_cache.put, key, model, response_text)
+    return parsed
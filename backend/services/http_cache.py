@@ -0,0 +1,115 @@
+"""Conditional GET for read endpoints that only change when attempts are written.
+
+Each cached route depends on a few resource counters (see services.versions). The strong
+ETag is a hash of the request URL and those counters, so it is known before the endpoint
+runs: a matching If-None-Match is answered with 304 after one primary-key lookup,
+without opening an ORM session. Full responses are kept in a small in-process LRU cache
+and reused until a counter moves.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from services.versions import ATTEMPTS, QUESTIONS, question_key, read_versions
+
+MAX_ENTRIES = 512
+
+# Part of every ETag, so a restart (possibly with new code and a new response format)
+# never confirms a representation it did not produce
+_BOOT_ID = os.urandom(8).hex()
+
+CACHED_ROUTES = [
+    (re.compile(r"/api/questions"), lambda m: (QUESTIONS, ATTEMPTS)),
+    (re.compile(r"/api/dashboard"), lambda m: (QUESTIONS, ATTEMPTS)),
+    (re.compile(r"/api/attempts/(\d+)"), lambda m: (QUESTIONS, question_key(int(m[1])))),
+    (re.compile(r"/api/attempts/(\d+)/progress"), lambda m: (QUESTIONS, question_key(int(m[1])))),
+    (re.compile(r"/api/attempts/(\d+)/(\d+)"), lambda m: (question_key(int(m[1])),)),
+]
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    headers: dict
+
+
+_lock = threading.Lock()
+_cache: OrderedDict[str, CachedResponse] = OrderedDict()
+_stats = {"hits": 0, "not_modified": 0, "misses": 0}
+
+
+def _resources_for(path: str) -> tuple[str, ...] | None:
+    for pattern, resources in CACHED_ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            return resources(match)
+    return None
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def _count(name: str):
+    with _lock:
+        _stats[name] += 1
+
+
+def cache_stats() -> dict:
+    with _lock:
+        return {**_stats, "entries": len(_cache)}
+
+
+async def conditional_get(request: Request, call_next):
+    if request.method != "GET" or getattr(request.state, "profiling", False):
+        return await call_next(request)
+    resources = _resources_for(request.url.path)
+    if resources is None:
+        return await call_next(request)
+
+    url = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+    versions = await run_in_threadpool(read_versions, resources)
+    etag = '"' + hashlib.sha256(f"{_BOOT_ID}|{url}|{versions}".encode()).hexdigest()[:32] + '"'
+    validators = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        _count("not_modified")
+        return Response(status_code=304, headers=validators)
+
+    with _lock:
+        cached = _cache.get(url)
+        if cached is not None and cached.etag == etag:
+            _cache.move_to_end(url)
+        else:
+            cached = None
+    if cached is not None:
+        _count("hits")
+        return Response(content=cached.body, headers=cached.headers)
+
+    _count("misses")
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {
+        name: value for name, value in response.headers.items() if name.lower() != "content-length"
+    }
+    headers.update(validators)
+    with _lock:
+        _cache[url] = CachedResponse(etag, body, headers)
+        _cache.move_to_end(url)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return Response(content=body, headers=headers)
@@ -0,0 +1,192 @@
+import logging
+import os
+import socket
+import time
+import uuid
+
+from sqlalchemy import func as sa_func, or_, and_, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, AnalysisJob
+from services.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+MAX_TRIES = int(os.environ.get("STARCOACH_JOB_MAX_TRIES", "3"))
+LEASE_SECONDS = float(os.environ.get("STARCOACH_JOB_LEASE_SECONDS", "600"))
+RETRY_BACKOFF_SECONDS = float(os.environ.get("STARCOACH_JOB_RETRY_BACKOFF_SECONDS", "30"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def make_worker_id() -> str:
+    """Identify a worker uniquely across hosts and processes."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def get_active_job(db: Session, attempt_id: int) -> AnalysisJob | None:
+    return (
+        db.query(AnalysisJob)
+        .filter(AnalysisJob.attempt_id == attempt_id, AnalysisJob.status.in_(ACTIVE_STATUSES))
+        .first()
+    )
+
+
+def enqueue_analysis(db: Session, attempt_id: int, profile: bool = False) -> AnalysisJob:
+    """Queue an analysis job for an attempt. Returns the existing job if one is already active.
+
+    With `profile`, the worker that runs the job records a cProfile profile of it.
+    """
+    job = get_active_job(db, attempt_id)
+    if job:
+        if profile and not job.profile:
+            job.profile = True
+            db.commit()
+        return job
+
+    now = time.time()
+    job = AnalysisJob(
+        attempt_id=attempt_id,
+        status="queued",
+        tries=0,
+        max_tries=MAX_TRIES,
+        available_at=now,
+        updated_at=now,
+        profile=profile,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _claimable(now: float):
+    return or_(
+        and_(AnalysisJob.status == "queued", AnalysisJob.available_at <= now),
+        # A running job whose lease ran out belongs to a worker that died
+        and_(AnalysisJob.status == "running", AnalysisJob.lease_expires_at < now),
+    )
+
+
+def claim_job(db: Session, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> AnalysisJob | None:
+    """Atomically claim the oldest runnable job for this worker, or return None.
+
+    The claim is a conditional UPDATE on a candidate row; if another worker wins the
+    race the rowcount is 0 and the next candidate is tried. This works on any database
+    that serializes row updates, so workers on several hosts can share one table.
+    """
+    for _ in range(5):
+        now = time.time()
+        candidate = (
+            db.query(AnalysisJob.id)
+            .filter(_claimable(now))
+            .order_by(AnalysisJob.available_at, AnalysisJob.id)
+            .first()
+        )
+        if candidate is None:
+            return None
+
+        result = db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == candidate.id, _claimable(now))
+            .values(
+                status="running",
+                lease_owner=worker_id,
+                lease_expires_at=now + lease_seconds,
+                tries=AnalysisJob.tries + 1,
+                updated_at=now,
+            )
+        )
+        db.commit()
+        if result.rowcount == 1:
+            return db.get(AnalysisJob, candidate.id)
+    return None
+
+
+def renew_lease(db: Session, job_id: int, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+    """Extend the lease on a running job. Returns False if the job was taken over."""
+    now = time.time()
+    result = db.execute(
+        update(AnalysisJob)
+        .where(
+            AnalysisJob.id == job_id,
+            AnalysisJob.status == "running",
+            AnalysisJob.lease_owner == worker_id,
+        )
+        .values(lease_expires_at=now + lease_seconds, updated_at=now)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def complete_job(db: Session, job_id: int, worker_id: str) -> None:
+    db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.lease_owner == worker_id)
+        .values(status="done", lease_owner=None, lease_expires_at=None, updated_at=time.time())
+    )
+    db.commit()
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str) -> bool:
+    """Record a failed run. Requeues with backoff while tries remain.
+
+    Returns True if the job has failed permanently.
+    """
+    job = db.get(AnalysisJob, job_id)
+    if job is None or job.lease_owner != worker_id:
+        return False
+
+    now = time.time()
+    job.last_error = error[-2000:]
+    job.lease_owner = None
+    job.lease_expires_at = None
+    job.updated_at = now
+    if job.tries >= job.max_tries:
+        job.status = "failed"
+    else:
+        job.status = "queued"
+        job.available_at = now + RETRY_BACKOFF_SECONDS * (2 ** (job.tries - 1))
+    db.commit()
+    return job.status == "failed"
+
+
+def queue_stats(db: Session) -> dict[str, int]:
+    """Count jobs per status."""
+    rows = (
+        db.query(AnalysisJob.status, sa_func.count(AnalysisJob.id))
+        .group_by(AnalysisJob.status)
+        .all()
+    )
+    stats = {status: 0 for status in ("queued", "running", "done", "failed")}
+    stats.update({status: count for status, count in rows})
+    return stats
+
+
+def _collect_metrics():
+    db = SessionLocal()
+    try:
+        stats = queue_stats(db)
+        now = time.time()
+        oldest = (
+            db.query(sa_func.min(AnalysisJob.available_at))
+            .filter(AnalysisJob.status == "queued", AnalysisJob.available_at <= now)
+            .scalar()
+        )
+    finally:
+        db.close()
+    yield (
+        "starcoach_analysis_jobs",
+        "Analysis jobs by status",
+        "gauge",
+        [({"status": status}, count) for status, count in stats.items()],
+    )
+    yield (
+        "starcoach_analysis_backlog_age_seconds",
+        "How long the oldest runnable queued job has been waiting",
+        "gauge",
+        [({}, now - oldest if oldest is not None else 0)],
+    )
+
+
+register_collector(_collect_metrics)
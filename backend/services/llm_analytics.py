@@ -1,14 +1,12 @@
 import logging
 
-from google import genai
 from pydantic import BaseModel, Field
 
-logger = logging.getLogger(__name__)
+from services.gemini import agenerate_structured, generate_structured, prompt_version
 
-SYSTEM_PROMPT = """\
-You are a speech analytics expert. Evaluate the following interview response transcript \
-and provide scores (1-5) with brief justifications for each metric.
+logger = logging.getLogger(__name__)
 
+RUBRICS = """\
 Scoring rubrics:
 
 **Clarity (1-5):**
@@ -32,6 +30,12 @@ Scoring rubrics:
 4 = Good structure with most STAR components (Situation, Task, Action, Result) present
 5 = Excellent STAR framework adherence with clear, distinct components"""
 
+SYSTEM_PROMPT = """\
+You are a speech analytics expert. Evaluate the following interview response transcript \
+and provide scores (1-5) with brief justifications for each metric.
+
+""" + RUBRICS
+
 
 class AnalyticsResult(BaseModel):
     clarity_score: int = Field(ge=1, le=5, description="Clarity score 1-5")
@@ -42,37 +46,38 @@ class AnalyticsResult(BaseModel):
     structure_justification: str = Field(description="1-2 sentence justification for structure score")
 
 
-def analyze_speech_with_llm(transcript_text: str) -> dict | None:
-    """Analyze speech using Gemini LLM. Returns dict with scores and justifications, or None on failure."""
-    try:
-        client = genai.Client()
+PROMPT_VERSION = prompt_version(SYSTEM_PROMPT, AnalyticsResult)
+
 
-        user_message = f"""Please analyze this interview response transcript:
+def build_user_message(transcript_text: str) -> str:
+    return f"""Please analyze this interview response transcript:
 
 {transcript_text}"""
 
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            contents=user_message,
-            config=genai.types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                response_mime_type="application/json",
-                response_json_schema=AnalyticsResult.model_json_schema(),
-            ),
-        )
-
-        if response.text is None:
-            raise ValueError("Gemini returned an empty response")
-
-        parsed = AnalyticsResult.model_validate_json(response.text)
-        return {
-            "clarity_llm_score": parsed.clarity_score,
-            "clarity_llm_justification": parsed.clarity_justification,
-            "confidence_llm_score": parsed.confidence_score,
-            "confidence_llm_justification": parsed.confidence_justification,
-            "structure_llm_score": parsed.structure_score,
-            "structure_llm_justification": parsed.structure_justification,
-        }
+
+def analyze_speech_with_llm(transcript_text: str) -> dict | None:
+    """Analyze speech using Gemini LLM. Returns dict with scores and justifications, or None on failure."""
+    try:
+        parsed = generate_structured(SYSTEM_PROMPT, AnalyticsResult, build_user_message(transcript_text))
+        return to_columns(parsed)
     except Exception:
         logger.exception("LLM speech analytics failed")
         return None
+
+
+async def aanalyze_speech_with_llm(transcript_text: str) -> dict:
+    """Async variant for bulk callers. Raises on failure."""
+    parsed = await agenerate_structured(SYSTEM_PROMPT, AnalyticsResult, build_user_message(transcript_text))
+    return to_columns(parsed)
+
+
+def to_columns(parsed: AnalyticsResult) -> dict:
+    """Map an AnalyticsResult onto the Analytics LLM columns."""
+    return {
+        "clarity_llm_score": parsed.clarity_score,
+        "clarity_llm_justification": parsed.clarity_justification,
+        "confidence_llm_score": parsed.confidence_score,
+        "confidence_llm_justification": parsed.confidence_justification,
+        "structure_llm_score": parsed.structure_score,
+        "structure_llm_justification": parsed.structure_justification,
+    }
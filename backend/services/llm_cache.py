@@ -0,0 +1,113 @@
+"""Persistent cache for Gemini structured-output responses.
+
+Entries are keyed by a hash of everything that determines the response: model name,
+system prompt, JSON schema and user message. Re-analysis, retries and backfills of an
+unchanged transcript are answered from the database instead of the API. The table is
+bounded to ``STARCOACH_LLM_CACHE_MAX_ENTRIES`` rows, evicting the least recently used.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import func as sa_func
+
+from database import SessionLocal, LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = int(os.environ.get("STARCOACH_LLM_CACHE_MAX_ENTRIES", "5000"))  # 0 disables the cache
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def cache_key(model: str, system_prompt: str, schema: dict, user_message: str) -> str:
+    payload = json.dumps(
+        [model, system_prompt, schema, user_message], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> str | None:
+    if MAX_ENTRIES <= 0:
+        return None
+    db = SessionLocal()
+    try:
+        entry = db.get(LLMCacheEntry, key)
+        if entry is None:
+            _count("misses")
+            return None
+        entry.hits += 1
+        entry.last_used_at = time.time()
+        response_text = entry.response_text
+        db.commit()
+        _count("hits")
+        return response_text
+    except Exception:
+        # A broken or locked cache table means calling Gemini, not failing the analysis
+        logger.exception("Failed to read LLM cache entry")
+        db.rollback()
+        _count("misses")
+        return None
+    finally:
+        db.close()
+
+
+def put(key: str, model: str, response_text: str):
+    if MAX_ENTRIES <= 0:
+        return
+    db = SessionLocal()
+    try:
+        now = time.time()
+        db.merge(LLMCacheEntry(
+            key=key, model=model, response_text=response_text,
+            hits=0, created_at=now, last_used_at=now,
+        ))
+        db.commit()
+        _evict(db)
+    except Exception:
+        # A cache write must never fail the analysis that produced the response
+        logger.exception("Failed to store LLM cache entry")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _evict(db):
+    excess = (db.query(sa_func.count(LLMCacheEntry.key)).scalar() or 0) - MAX_ENTRIES
+    if excess <= 0:
+        return
+    oldest = (
+        db.query(LLMCacheEntry.key)
+        .order_by(LLMCacheEntry.last_used_at)
+        .limit(excess)
+        .subquery()
+    )
+    deleted = (
+        db.query(LLMCacheEntry)
+        .filter(LLMCacheEntry.key.in_(db.query(oldest.c.key)))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    _count("evictions", deleted)
+
+
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters for this process, plus the current number of entries."""
+    with _stats_lock:
+        stats = dict(_stats)
+    db = SessionLocal()
+    try:
+        stats["entries"] = db.query(sa_func.count(LLMCacheEntry.key)).scalar() or 0
+    finally:
+        db.close()
+    stats["max_entries"] = MAX_ENTRIES
+    return stats
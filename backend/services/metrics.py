@@ -0,0 +1,301 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated where things happen: HTTP requests, pipeline
+stages, Gemini calls and uploads. Gauges that describe current state (queue depth,
+work in flight) are read from collector functions when the metrics are scraped.
+Each process keeps its own numbers. The API serves them at ``/api/metrics``, and a
+standalone worker serves them on ``--metrics-port``.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable
+
+from fastapi import Request
+from starlette.routing import Mount
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a cached endpoint hit to a long Whisper run
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Bytes per second, from a slow mobile uplink to a local network
+THROUGHPUT_BUCKETS = tuple(2 ** n * 1024 for n in range(4, 17, 2))
+
+# A collector returns (name, help, type, [(labels, value), ...]) families at scrape time
+Family = tuple[str, str, str, list[tuple[dict, float]]]
+
+_registry: list["_Metric"] = []
+_collectors: list[Callable[[], Iterable[Family]]] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        names = self.labelnames + ("le",)
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def register_collector(collect: Callable[[], Iterable[Family]]):
+    """Add a function that reports gauges at scrape time. Its errors are logged, not raised."""
+    with _registry_lock:
+        _collectors.append(collect)
+
+
+def render() -> str:
+    with _registry_lock:
+        metrics, collectors = list(_registry), list(_collectors)
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    for collect in collectors:
+        try:
+            families = list(collect())
+        except Exception:
+            logger.exception("Metrics collector %s failed", getattr(collect, "__name__", collect))
+            continue
+        for name, help, kind, samples in families:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            lines += [
+                f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}" for labels, value in samples
+            ]
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "starcoach_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "starcoach_analysis_stage_duration_seconds",
+    "Wall time of each analysis pipeline stage",
+    ("stage", "status"),
+)
+STAGE_COMMIT_SECONDS = Histogram(
+    "starcoach_analysis_stage_commit_seconds",
+    "Time spent committing a stage's results to the database",
+    ("stage",),
+)
+JOB_SECONDS = Histogram(
+    "starcoach_analysis_job_duration_seconds",
+    "Wall time of an analysis job, from claim to completion",
+    ("outcome",),
+)
+JOB_QUEUE_WAIT_SECONDS = Histogram(
+    "starcoach_analysis_job_queue_wait_seconds",
+    "Time a job spent runnable before a worker claimed it",
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "starcoach_llm_request_duration_seconds",
+    "Latency of each Gemini request, retries counted separately",
+    ("model", "outcome"),
+)
+LLM_FAILURES = Counter(
+    "starcoach_llm_failures_total",
+    "Gemini calls that failed after any retries",
+    ("model", "reason"),
+)
+LLM_RETRIES = Counter(
+    "starcoach_llm_retries_total",
+    "Gemini requests retried after a transient error",
+    ("model",),
+)
+UPLOAD_BYTES = Counter(
+    "starcoach_upload_bytes_total",
+    "Recording bytes received",
+    ("kind",),
+)
+UPLOAD_THROUGHPUT = Histogram(
+    "starcoach_upload_throughput_bytes_per_second",
+    "Receive rate of each upload request body",
+    ("kind",),
+    buckets=THROUGHPUT_BUCKETS,
+)
+
+
+def observe_upload(kind: str, size: int, seconds: float):
+    UPLOAD_BYTES.inc(size, kind=kind)
+    if size and seconds > 0:
+        UPLOAD_THROUGHPUT.observe(size / seconds, kind=kind)
+
+
+_route_table: list[tuple[re.Pattern, set[str] | None, str]] | None = None
+_route_table_lock = threading.Lock()
+
+
+def _build_route_table(app) -> list[tuple[re.Pattern, set[str] | None, str]]:
+    routes = [
+        (path, {method.upper() for method in operations}, False)
+        for path, operations in app.openapi().get("paths", {}).items()
+    ]
+    # Routes left out of the schema (health, metrics) and static mounts
+    routes += [
+        (route.path, getattr(route, "methods", None), isinstance(route, Mount))
+        for route in app.routes
+        if getattr(route, "path", None)
+    ]
+    table = []
+    for path, methods, is_mount in routes:
+        parts = re.split(r"(\{[^}]+\})", path)
+        pattern = "".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts)
+        if is_mount:
+            pattern += "(/.*)?"
+        table.append((re.compile(pattern), methods, path))
+    # Literal segments win over parameters, as they do in the router
+    table.sort(key=lambda entry: entry[2].count("{"))
+    return table
+
+
+def _route_template(request: Request) -> str:
+    """The path pattern a request matched, e.g. ``/api/attempts/{question_id}``.
+
+    Labelling by pattern rather than raw path keeps one series per route. Responses
+    answered by middleware (cached GETs, 304s) never reach the router, so the pattern
+    is found by matching the path against the app's routes.
+    """
+    global _route_table
+    if _route_table is None:
+        with _route_table_lock:
+            if _route_table is None:
+                _route_table = _build_route_table(request.app)
+    for pattern, methods, template in _route_table:
+        if pattern.fullmatch(request.url.path) and (methods is None or request.method in methods):
+            return template
+    return "unmatched"
+
+
+async def track_requests(request: Request, call_next):
+    """Middleware recording time to response headers per method, route and status."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=_route_template(request),
+            status=status,
+        )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` on `port` from a daemon thread, for processes without the API."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+    return server
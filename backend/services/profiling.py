@@ -0,0 +1,241 @@
+"""Opt-in profiling of single requests and analysis jobs.
+
+Nothing is profiled unless ``STARCOACH_PROFILING=1``. Then:
+
+- A request sent with ``X-Profile: 1`` (or ``?profile=1``) is profiled with a wall-clock
+  stack sampler. Endpoints run on the event loop or on threadpool threads that a
+  tracing profiler attached to the middleware would not see, so the sampler records
+  every thread that is doing something. Concurrent requests show up as well; profile
+  on a quiet server. The response carries the profile's id in ``X-Profile-Id``.
+- An analysis queued with ``POST /api/analyze/{id}?profile_job=true`` runs under cProfile in
+  the worker that claims it. Time spent waiting on Gemini or the transcription pool
+  shows up as waits in the frames that made the call.
+
+Profiles are written to ``data/profiles``. Request profiles are collapsed stacks (one
+``frame;frame;frame count`` line per stack, the input format of flame graph tools) and
+job profiles are ``pstats`` dumps. Only the newest ``STARCOACH_PROFILES_KEEP`` are kept.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.environ.get("STARCOACH_PROFILING", "0") == "1"
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "profiles")
+PROFILES_KEEP = int(os.environ.get("STARCOACH_PROFILES_KEEP", "50"))
+SAMPLE_INTERVAL_SECONDS = float(os.environ.get("STARCOACH_PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+
+FORMATS = {"collapsed": ".folded", "pstats": ".prof"}
+
+# Innermost Python frames of a thread blocked with nothing to do
+_IDLE_FRAMES = {"wait", "select", "poll", "accept", "_wait_for_tstate_lock"}
+_PROFILE_ID = re.compile(r"^[0-9]{20}-[0-9a-f]{6}$")
+
+_write_lock = threading.Lock()
+_job_profile_lock = threading.Lock()
+
+
+class StackSampler:
+    """Samples the Python stack of every busy thread at a fixed interval."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or frame.f_code.co_name in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+def _new_id() -> str:
+    # Sortable by creation time down to the microsecond, which pruning relies on
+    now = time.time()
+    stamp = time.strftime("%Y%m%d%H%M%S", time.gmtime(now)) + f"{int(now % 1 * 1e6):06d}"
+    return f"{stamp}-{uuid.uuid4().hex[:6]}"
+
+
+def _paths(profile_id: str, fmt: str) -> tuple[str, str]:
+    base = os.path.join(PROFILES_DIR, profile_id)
+    return base + FORMATS[fmt], base + ".json"
+
+
+def _save(kind: str, target: str, seconds: float, fmt: str, write, **extra) -> str:
+    """Store a profile written by ``write(path)`` with its metadata, then apply retention."""
+    profile_id = _new_id()
+    data_path, meta_path = _paths(profile_id, fmt)
+    meta = {
+        "id": profile_id,
+        "kind": kind,
+        "target": target,
+        "format": fmt,
+        "seconds": round(seconds, 4),
+        "created_at": time.time(),
+        **extra,
+    }
+    with _write_lock:
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        write(data_path)
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        _prune()
+    logger.info("Saved %s profile %s for %s (%.3fs)", kind, profile_id, target, seconds)
+    return profile_id
+
+
+def _prune():
+    ids = sorted(name[:-5] for name in os.listdir(PROFILES_DIR) if name.endswith(".json"))
+    for profile_id in ids[: max(len(ids) - PROFILES_KEEP, 0)]:
+        delete_profile(profile_id)
+
+
+def list_profiles() -> list[dict]:
+    """Metadata of the stored profiles, newest first."""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILES_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILES_DIR, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # pruned or half-written meanwhile
+    return profiles
+
+
+def get_profile(profile_id: str) -> tuple[dict, str] | None:
+    """The metadata and data file path of a stored profile, or None."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(PROFILES_DIR, f"{profile_id}.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    return meta, _paths(profile_id, meta["format"])[0]
+
+
+def delete_profile(profile_id: str) -> bool:
+    if not _PROFILE_ID.match(profile_id):
+        return False
+    deleted = False
+    for suffix in (*FORMATS.values(), ".json"):
+        try:
+            os.unlink(os.path.join(PROFILES_DIR, profile_id + suffix))
+            deleted = True
+        except FileNotFoundError:
+            pass
+    return deleted
+
+
+def pstats_text(path: str, sort: str = "cumulative", limit: int = 60) -> str:
+    """Render a pstats dump as the usual text table."""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+@contextmanager
+def profile_job(job_id: int, attempt_id: int, enabled: bool):
+    """Run the body under cProfile and store the result, when `enabled`.
+
+    Only one job per process is profiled at a time: Python allows a single active
+    profiler. A flagged job that finds it busy runs without one.
+    """
+    if not enabled:
+        yield
+        return
+    if not _job_profile_lock.acquire(blocking=False):
+        logger.warning("Another job is being profiled; running job %d without a profile", job_id)
+        yield
+        return
+    try:
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            try:
+                target = f"job {job_id} (attempt {attempt_id})"
+                _save("job", target, time.perf_counter() - started, "pstats", profiler.dump_stats)
+            except Exception:
+                logger.exception("Failed to save profile for job %d", job_id)
+    finally:
+        _job_profile_lock.release()
+
+
+def _wants_profile(request: Request) -> bool:
+    return request.headers.get("x-profile") == "1" or request.query_params.get("profile") == "1"
+
+
+async def profile_requests(request: Request, call_next):
+    """Middleware: sample the process while a flagged request is handled (time to headers)."""
+    if not PROFILING_ENABLED or not _wants_profile(request):
+        return await call_next(request)
+
+    # Read by the HTTP cache, so the endpoint really runs instead of being answered from memory
+    request.state.profiling = True
+    sampler = StackSampler()
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        stacks = await run_in_threadpool(sampler.stop)
+    seconds = time.perf_counter() - started
+
+    def write(path: str):
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    target = f"{request.method} {request.url.path}"
+    try:
+        response.headers["X-Profile-Id"] = await run_in_threadpool(
+            _save, "request", target, seconds, "collapsed", write,
+            samples=sampler.samples, interval_ms=sampler.interval * 1000,
+        )
+    except Exception:
+        logger.exception("Failed to save profile for %s", target)
+    return response
@@ -0,0 +1,78 @@
+"""Liveness and readiness for health checks.
+
+The API is live as soon as it answers HTTP. It is ready once startup has initialized
+and seeded the database and the speech model has been loaded. The model is warmed up
+in the background after startup when ``STARCOACH_ASR_WARMUP`` is on (the default), so
+the first analysis does not pay for importing Whisper and loading its weights. A failed
+warm-up keeps the API unready, since it could not transcribe, and is retried with a
+growing delay until the model loads.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ASR_WARMUP = os.environ.get("STARCOACH_ASR_WARMUP", "1") == "1"
+RETRY_SECONDS = 10
+MAX_RETRY_SECONDS = 300
+
+_lock = threading.Lock()
+_state = {
+    "database": False,
+    "asr": "pending" if ASR_WARMUP else "disabled",  # pending | loading | ready | failed | disabled
+    "asr_seconds": None,
+    "asr_error": None,
+}
+
+
+def _update(**changes):
+    with _lock:
+        _state.update(changes)
+
+
+def mark_database_ready():
+    _update(database=True)
+
+
+def warm_up_asr() -> bool:
+    """Load the speech model now. Never raises; the outcome is recorded for readiness."""
+    from services.transcription import warm_up
+
+    _update(asr="loading")
+    started = time.perf_counter()
+    try:
+        warm_up()
+    except Exception as e:
+        logger.exception("ASR warm-up failed")
+        _update(asr="failed", asr_error=str(e))
+        return False
+    seconds = round(time.perf_counter() - started, 2)
+    _update(asr="ready", asr_seconds=seconds, asr_error=None)
+    logger.info("ASR model ready after %.2fs", seconds)
+    return True
+
+
+def _warm_up_until_ready():
+    delay = RETRY_SECONDS
+    while not warm_up_asr():
+        logger.warning("Retrying ASR warm-up in %ds", delay)
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+
+def start_asr_warm_up() -> threading.Thread | None:
+    if not ASR_WARMUP:
+        return None
+    thread = threading.Thread(target=_warm_up_until_ready, name="asr-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> tuple[bool, dict]:
+    with _lock:
+        state = dict(_state)
+    ready = state["database"] and state["asr"] in ("ready", "disabled")
+    status = "ready" if ready else "failed" if state["asr"] == "failed" else "starting"
+    return ready, {"status": status, **state}
@@ -0,0 +1,280 @@
+"""Archive old recordings as compact audio.
+
+Each ``.webm`` recording keeps full video forever unless retention is enabled. Once an
+attempt has finished analysis and is ``STARCOACH_RETENTION_AFTER_DAYS`` old (0 means as
+soon as analysis completes), the compactor transcodes its soundtrack to mono Opus
+(``<stem>.ogg``, ~24 kbit/s) and deletes the decoded PCM cache. Unless
+``STARCOACH_RETENTION_KEEP_VIDEO`` is set, it also deletes the video and points
+``Attempt.video_path`` at the audio file, so playback and re-analysis keep working.
+The PCM cache is keyed by the stem, so it is rebuilt from the archive when needed.
+
+The compactor runs next to the analysis workers and can also be run by hand:
+
+    uv run python -m services.retention --dry-run
+    uv run python -m services.retention --after-days 30 --keep-video
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exists, func as sa_func, update
+
+from database import SessionLocal, AnalysisJob, Attempt, Feedback, init_db
+from services.audio import audio_cache_path, recording_path
+from services.jobs import ACTIVE_STATUSES
+from services.versions import bump_question
+
+logger = logging.getLogger(__name__)
+
+_after_days = os.environ.get("STARCOACH_RETENTION_AFTER_DAYS", "")
+RETENTION_AFTER_DAYS = float(_after_days) if _after_days else None  # None: retention off
+KEEP_VIDEO = os.environ.get("STARCOACH_RETENTION_KEEP_VIDEO", "0") == "1"
+INTERVAL_SECONDS = float(os.environ.get("STARCOACH_RETENTION_INTERVAL_SECONDS", "3600"))
+AUDIO_BITRATE = os.environ.get("STARCOACH_ARCHIVE_BITRATE", "24k")
+ARCHIVE_SUFFIX = ".ogg"
+BATCH_SIZE = 100
+
+_last_run: dict | None = None
+
+
+def archive_name(video_filename: str) -> str:
+    stem, _ext = os.path.splitext(os.path.basename(video_filename))
+    return stem + ARCHIVE_SUFFIX
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def transcode_audio(source: str, destination: str):
+    """Write the soundtrack of `source` to `destination` as mono Opus in Ogg."""
+    tmp_path = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-i", source,
+        "-vn", "-ac", "1", "-c:a", "libopus", "-b:a", AUDIO_BITRATE, "-application", "voip",
+        "-f", "ogg", tmp_path,
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        os.replace(tmp_path, destination)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to transcode audio: {e.stderr.decode(errors='replace')}") from e
+    finally:
+        _unlink(tmp_path)
+
+
+def compact_attempt(attempt_id: int, keep_video: bool = KEEP_VIDEO) -> int | None:
+    """Archive one attempt's recording. Returns the bytes reclaimed, or None if skipped.
+
+    The database row is switched over before any file is deleted, so a concurrent
+    reader sees either the old recording or the finished archive.
+    """
+    db = SessionLocal()
+    try:
+        attempt = db.get(Attempt, attempt_id)
+        if attempt is None or attempt.archived_at is not None:
+            return None
+        video_filename, question_id = attempt.video_path, attempt.question_id
+    finally:
+        db.close()
+
+    source = recording_path(video_filename)
+    if not os.path.exists(source):
+        # Stamped with no archive so later passes stop picking it up
+        logger.warning("Recording for attempt %d is missing; marking it as having nothing to archive", attempt_id)
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Attempt)
+                .where(Attempt.id == attempt_id, Attempt.archived_at.is_(None))
+                .values(archived_at=sa_func.now(), bytes_reclaimed=0)
+            )
+            db.commit()
+        finally:
+            db.close()
+        return None
+
+    audio_filename = archive_name(video_filename)
+    audio_file = recording_path(audio_filename)
+    if audio_file != source:
+        transcode_audio(source, audio_file)
+    pcm_file = audio_cache_path(video_filename)
+    drop_video = not keep_video and audio_file != source
+
+    before = _size(source) + _size(pcm_file)
+    after = _size(audio_file) + (0 if drop_video else _size(source))
+    reclaimed = before - after
+
+    values = {"audio_path": audio_filename, "archived_at": sa_func.now(), "bytes_reclaimed": reclaimed}
+    if drop_video:
+        values["video_path"] = audio_filename
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(Attempt)
+            .where(Attempt.id == attempt_id, Attempt.archived_at.is_(None))
+            .values(**values)
+        ).rowcount
+        if not claimed:
+            return None  # another compactor got there first; the archive file is the same
+        bump_question(db, question_id)
+        db.commit()
+    finally:
+        db.close()
+
+    _unlink(pcm_file)
+    if drop_video:
+        _unlink(source)
+    logger.info("Archived attempt %d, reclaimed %d bytes", attempt_id, reclaimed)
+    return reclaimed
+
+
+def eligible_attempts(after_days: float, limit: int, after_id: int = 0) -> list[int]:
+    """Analyzed, unarchived attempts at least `after_days` old with no analysis in flight.
+
+    Ordered by id; pass the last id of the previous batch as `after_id` for the next one.
+    """
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=after_days)
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Attempt.id)
+            .filter(
+                Attempt.id > after_id,
+                Attempt.archived_at.is_(None),
+                Attempt.created_at <= cutoff,
+                exists().where(Feedback.attempt_id == Attempt.id),
+                ~exists().where(
+                    AnalysisJob.attempt_id == Attempt.id, AnalysisJob.status.in_(ACTIVE_STATUSES)
+                ),
+            )
+            .order_by(Attempt.id)
+            .limit(limit)
+            .all()
+        )
+        return [attempt_id for (attempt_id,) in rows]
+    finally:
+        db.close()
+
+
+def compact(
+    after_days: float | None = RETENTION_AFTER_DAYS,
+    keep_video: bool = KEEP_VIDEO,
+    limit: int | None = None,
+    dry_run: bool = False,
+) -> dict:
+    """Archive every eligible attempt. Returns a report of what was done."""
+    global _last_run
+    report = {"archived": 0, "failed": 0, "bytes_reclaimed": 0}
+    if after_days is None:
+        return report
+
+    started = time.time()
+    seen = last_id = 0
+    while limit is None or seen < limit:
+        # Paged by id, so attempts that were skipped or failed are not fetched again
+        size = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - seen)
+        batch = eligible_attempts(after_days, size, after_id=last_id)
+        if not batch:
+            break
+        last_id = batch[-1]
+        for attempt_id in batch:
+            seen += 1
+            if dry_run:
+                continue
+            try:
+                reclaimed = compact_attempt(attempt_id, keep_video)
+            except Exception:
+                logger.exception("Failed to archive attempt %d", attempt_id)
+                report["failed"] += 1
+                continue
+            if reclaimed is not None:
+                report["archived"] += 1
+                report["bytes_reclaimed"] += reclaimed
+
+    if dry_run:
+        report["eligible"] = seen
+    else:
+        _last_run = {**report, "finished_at": time.time(), "seconds": round(time.time() - started, 2)}
+    return report
+
+
+def retention_stats() -> dict:
+    db = SessionLocal()
+    try:
+        archived, reclaimed = db.query(
+            sa_func.count(Attempt.audio_path), sa_func.coalesce(sa_func.sum(Attempt.bytes_reclaimed), 0)
+        ).one()
+    finally:
+        db.close()
+    return {
+        "after_days": RETENTION_AFTER_DAYS,
+        "keep_video": KEEP_VIDEO,
+        "archived_attempts": archived,
+        "bytes_reclaimed": reclaimed,
+        "last_run": _last_run,
+    }
+
+
+def after_analysis(attempt_id: int):
+    """Archive right away when retention is set to 0 days. Never raises."""
+    if RETENTION_AFTER_DAYS != 0:
+        return
+    try:
+        compact_attempt(attempt_id)
+    except Exception:
+        logger.exception("Failed to archive attempt %d", attempt_id)
+
+
+def run_compactor(stop: threading.Event, interval: float = INTERVAL_SECONDS):
+    while not stop.is_set():
+        try:
+            report = compact()
+            if report["archived"] or report["failed"]:
+                logger.info("Retention pass: %s", report)
+        except Exception:
+            logger.exception("Retention pass failed")
+        stop.wait(interval)
+
+
+def start_compactor(stop: threading.Event) -> threading.Thread | None:
+    """Run the compactor in a daemon thread until `stop` is set. No-op when retention is off."""
+    if RETENTION_AFTER_DAYS is None:
+        return None
+    thread = threading.Thread(target=run_compactor, args=(stop,), name="retention-compactor", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive analyzed recordings as audio-only files")
+    parser.add_argument("--after-days", type=float, default=RETENTION_AFTER_DAYS if RETENTION_AFTER_DAYS is not None else 30)
+    parser.add_argument("--keep-video", action="store_true", default=KEEP_VIDEO)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--dry-run", action="store_true", help="count eligible attempts without changing anything")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    print(json.dumps(compact(args.after_days, args.keep_video, args.limit, args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Incrementally maintained aggregates for the dashboard.
+
+``record_attempt`` and ``record_analytics`` update the rollup tables inside the caller's
+transaction, so the totals commit (or roll back) together with the rows they count.
+``GET /dashboard`` then reads one row plus recent days instead of scanning ``attempts``
+and ``analytics``. If the tables ever drift, rebuild them from scratch:
+
+    uv run python -m services.rollups
+"""
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, update
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from database import (
+    SessionLocal, Attempt, Analytics, DashboardRollup, DailyActivity, QuestionRollup, init_db,
+    upsert_increment,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_ID = 1
+SCORE_METRICS = ("clarity", "confidence", "structure")
+
+
+def _today() -> str:
+    # attempts.created_at defaults to SQLite's CURRENT_TIMESTAMP, which is UTC
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def record_attempt(db: Session, question_id: int, duration_seconds: float | None):
+    """Count a new attempt. Call in the transaction that inserts it."""
+    # Decided by the upsert's own result: two concurrent first attempts cannot both see 1
+    question_attempts = upsert_increment(
+        db, QuestionRollup, {"question_id": question_id}, {"attempt_count": 1}, returning="attempt_count"
+    )
+    upsert_increment(db, DailyActivity, {"date": _today()}, {"attempt_count": 1})
+    db.execute(
+        update(DashboardRollup)
+        .where(DashboardRollup.id == ROLLUP_ID)
+        .values(
+            total_attempts=DashboardRollup.total_attempts + 1,
+            questions_practiced=DashboardRollup.questions_practiced + int(question_attempts == 1),
+            total_practice_time=DashboardRollup.total_practice_time + (duration_seconds or 0),
+        )
+    )
+
+
+def record_analytics(db: Session, new: dict, old: dict | None = None):
+    """Fold heuristic scores into the averages.
+
+    `new` and `old` map column names (``clarity_score`` etc.) to values; pass `old` when
+    rescoring an attempt that was already counted.
+    """
+    values = {}
+    for metric in SCORE_METRICS:
+        sum_delta = count_delta = 0
+        for scores, sign in ((new, 1), (old or {}, -1)):
+            score = scores.get(f"{metric}_score")
+            if score is not None:
+                sum_delta += sign * score
+                count_delta += sign
+        if count_delta or sum_delta:
+            values[f"{metric}_sum"] = getattr(DashboardRollup, f"{metric}_sum") + sum_delta
+            values[f"{metric}_count"] = getattr(DashboardRollup, f"{metric}_count") + count_delta
+    if values:
+        db.execute(update(DashboardRollup).where(DashboardRollup.id == ROLLUP_ID).values(**values))
+
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup table from attempts and analytics, in one transaction."""
+    db.query(DailyActivity).delete()
+    db.query(QuestionRollup).delete()
+    db.query(DashboardRollup).delete()
+
+    per_question = (
+        db.query(Attempt.question_id, sa_func.count(Attempt.id))
+        .group_by(Attempt.question_id)
+        .all()
+    )
+    if per_question:
+        db.execute(insert(QuestionRollup), [
+            {"question_id": question_id, "attempt_count": count}
+            for question_id, count in per_question
+        ])
+
+    per_day = (
+        db.query(sa_func.date(Attempt.created_at), sa_func.count(Attempt.id))
+        .group_by(sa_func.date(Attempt.created_at))
+        .all()
+    )
+    days = [{"date": str(day), "attempt_count": count} for day, count in per_day if day]
+    if days:
+        db.execute(insert(DailyActivity), days)
+
+    total_attempts, total_practice_time = db.query(
+        sa_func.count(Attempt.id), sa_func.coalesce(sa_func.sum(Attempt.duration_seconds), 0)
+    ).one()
+    score_totals = db.query(*[
+        column
+        for metric in SCORE_METRICS
+        for column in (
+            sa_func.coalesce(sa_func.sum(getattr(Analytics, f"{metric}_score")), 0),
+            sa_func.count(getattr(Analytics, f"{metric}_score")),
+        )
+    ]).one()
+
+    rollup = DashboardRollup(
+        id=ROLLUP_ID,
+        total_attempts=total_attempts,
+        questions_practiced=len(per_question),
+        total_practice_time=total_practice_time,
+    )
+    for i, metric in enumerate(SCORE_METRICS):
+        setattr(rollup, f"{metric}_sum", score_totals[2 * i])
+        setattr(rollup, f"{metric}_count", score_totals[2 * i + 1])
+    db.add(rollup)
+    db.commit()
+
+
+def ensure_rollups():
+    """Build the rollups on first start (or after an upgrade) if they don't exist yet."""
+    db = SessionLocal()
+    try:
+        if db.get(DashboardRollup, ROLLUP_ID) is None:
+            logger.info("Building dashboard rollups")
+            rebuild_rollups(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+    finally:
+        db.close()
+    print("Dashboard rollups rebuilt.")
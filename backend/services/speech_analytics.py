@@ -1,101 +1,132 @@
+import hashlib
 import json
 import re
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+from services.word_timestamps import timing_arrays
 
 # Only unambiguous filler words — avoids false positives from common words like
 # "so", "like", "right", "well" which are often used meaningfully in sentences.
 FILLER_WORDS = {"um", "uh", "umm", "uhh", "you know", "actually", "basically", "I mean", "kind of", "sort of"}
 
+PAUSE_THRESHOLD_SECONDS = 1.5
+
+# One alternation over every filler, matched against the lowercased transcript in a
+# single pass. Longest first so a multi-word filler wins over any prefix of it.
+_FILLER_NAMES = {filler.lower(): filler for filler in FILLER_WORDS}
+_FILLER_PATTERN = re.compile(
+    r"\b(?:"
+    + "|".join(re.escape(f) for f in sorted(_FILLER_NAMES, key=len, reverse=True))
+    + r")\b"
+)
+
+# Score bands for np.searchsorted(side="right"): a value equal to an edge falls in the next band
+_CLARITY_EDGES = np.array([0.02, 0.05, 0.08, 0.12])  # filler ratio -> 5..1
+_CONFIDENCE_EDGES = np.array([2, 4, 6, 8])  # pauses per minute -> 5..1
+_STRUCTURE_EDGES = np.array([15, 30, 60, 100, 401, 501, 601, 801])  # word count
+_STRUCTURE_SCORES = np.array([1, 2, 3, 4, 5, 4, 3, 2, 1])
+
+# Stored with each Analytics row so a backfill can find rows scored by older rules.
+# Changes to the fillers and thresholds above change the version automatically; bump
+# HEURISTICS_REVISION when the scoring code itself changes.
+HEURISTICS_REVISION = 1
+HEURISTICS_VERSION = f"{HEURISTICS_REVISION}-" + hashlib.sha256(json.dumps([
+    sorted(FILLER_WORDS),
+    PAUSE_THRESHOLD_SECONDS,
+    *(edges.tolist() for edges in (_CLARITY_EDGES, _CONFIDENCE_EDGES, _STRUCTURE_EDGES, _STRUCTURE_SCORES)),
+]).encode("utf-8")).hexdigest()[:8]
+
+
+def _count_fillers(text_lower: str) -> dict[str, int]:
+    counts = Counter(_FILLER_PATTERN.findall(text_lower))
+    return {_FILLER_NAMES[match]: count for match, count in counts.items()}
+
 
 def analyze_speech(
     transcript_text: str,
-    word_timestamps_json: str,
+    word_timestamps: bytes | str | None,
     duration_seconds: float | None,
 ) -> dict:
-    """Analyze speech patterns from transcript. Returns dict matching Analytics columns."""
-    words_list = transcript_text.split()
-    total_words = len(words_list)
-
-    # Parse word timestamps for pause detection
-    timestamps = []
-    try:
-        timestamps = json.loads(word_timestamps_json) if word_timestamps_json else []
-    except json.JSONDecodeError:
-        pass
-
-    # Pause detection (gaps > 1.5 seconds between words)
-    pause_count = 0
-    for i in range(1, len(timestamps)):
-        gap = timestamps[i]["start"] - timestamps[i - 1]["end"]
-        if gap > 1.5:
-            pause_count += 1
-
-    # Filler word detection
-    text_lower = transcript_text.lower()
-    filler_detail = {}
-    filler_total = 0
-
-    for filler in FILLER_WORDS:
-        count = len(re.findall(r'\b' + re.escape(filler) + r'\b', text_lower))
-        if count > 0:
-            filler_detail[filler] = count
-            filler_total += count
-
-    # Duration and WPM
-    if duration_seconds and duration_seconds > 0:
-        answer_duration = duration_seconds
-    elif timestamps:
-        answer_duration = timestamps[-1]["end"] - timestamps[0]["start"]
-    else:
-        answer_duration = 0
-
-    wpm = (total_words / (answer_duration / 60)) if answer_duration > 0 else 0
+    """Analyze speech patterns from transcript. Returns dict matching Analytics columns.
+
+    `word_timestamps` is an encoded blob (see services.word_timestamps) or legacy JSON text.
+    """
+    return analyze_speech_batch([(transcript_text, word_timestamps, duration_seconds)])[0]
+
+
+def analyze_speech_batch(
+    items: Iterable[tuple[str, bytes | str | None, float | None]],
+) -> list[dict]:
+    """Score many attempts at once.
+
+    Each item is (transcript_text, word_timestamps, duration_seconds). Text is scanned
+    once per item; pause detection, durations and all scoring run as array operations over
+    the whole batch. Returns one dict per item, matching Analytics columns.
+    """
+    items = list(items)
+    n = len(items)
+    if n == 0:
+        return []
+
+    word_counts = np.empty(n, dtype=np.int64)
+    filler_totals = np.empty(n, dtype=np.int64)
+    filler_details = []
+    starts_parts = []
+    ends_parts = []
+    for i, (transcript_text, word_timestamps, _duration) in enumerate(items):
+        word_counts[i] = len(transcript_text.split())
+        detail = _count_fillers(transcript_text.lower())
+        filler_details.append(detail)
+        filler_totals[i] = sum(detail.values())
+        starts, ends = timing_arrays(word_timestamps)
+        starts_parts.append(starts)
+        ends_parts.append(ends)
+
+    # Pause detection (gaps > 1.5 seconds between words) over all items at once.
+    # owner[k] is the item word k belongs to; gaps that cross items are ignored.
+    lengths = np.array([len(s) for s in starts_parts], dtype=np.int64)
+    starts_all = np.concatenate(starts_parts)
+    ends_all = np.concatenate(ends_parts)
+    owner = np.repeat(np.arange(n), lengths)
+    gaps = starts_all[1:] - ends_all[:-1]
+    is_pause = (owner[1:] == owner[:-1]) & (gaps > PAUSE_THRESHOLD_SECONDS)
+    pause_counts = np.bincount(owner[1:][is_pause], minlength=n)
+
+    # Duration: client-reported if present, else the span of the word timestamps
+    reported = np.array([d if d and d > 0 else 0.0 for _t, _w, d in items], dtype=np.float64)
+    has_words = lengths > 0
+    first = np.cumsum(lengths) - lengths
+    last = first + lengths - 1
+    spans = np.zeros(n, dtype=np.float64)
+    spans[has_words] = ends_all[last[has_words]] - starts_all[first[has_words]]
+    durations = np.where(reported > 0, reported, spans)
+
+    minutes = durations / 60
+    wpm = np.divide(word_counts, minutes, out=np.zeros(n), where=durations > 0)
 
     # Scoring (1-5 scale)
     # Clarity: based on filler word ratio
-    filler_ratio = filler_total / max(total_words, 1)
-    if filler_ratio < 0.02:
-        clarity_score = 5
-    elif filler_ratio < 0.05:
-        clarity_score = 4
-    elif filler_ratio < 0.08:
-        clarity_score = 3
-    elif filler_ratio < 0.12:
-        clarity_score = 2
-    else:
-        clarity_score = 1
-
+    filler_ratio = filler_totals / np.maximum(word_counts, 1)
+    clarity = 5 - np.searchsorted(_CLARITY_EDGES, filler_ratio, side="right")
     # Confidence: based on pause frequency and pacing
-    pause_rate = pause_count / max(answer_duration / 60, 0.1)
-    if pause_rate < 2:
-        confidence_score = 5
-    elif pause_rate < 4:
-        confidence_score = 4
-    elif pause_rate < 6:
-        confidence_score = 3
-    elif pause_rate < 8:
-        confidence_score = 2
-    else:
-        confidence_score = 1
-
+    pause_rate = pause_counts / np.maximum(minutes, 0.1)
+    confidence = 5 - np.searchsorted(_CONFIDENCE_EDGES, pause_rate, side="right")
     # Structure: based on answer length (too short or too long penalized)
-    if 100 <= total_words <= 400:
-        structure_score = 5
-    elif 60 <= total_words < 100 or 400 < total_words <= 500:
-        structure_score = 4
-    elif 30 <= total_words < 60 or 500 < total_words <= 600:
-        structure_score = 3
-    elif 15 <= total_words < 30 or 600 < total_words <= 800:
-        structure_score = 2
-    else:
-        structure_score = 1
-
-    return {
-        "pause_count": pause_count,
-        "filler_word_count": filler_total,
-        "filler_words_detail": json.dumps(filler_detail),
-        "answer_duration_seconds": round(answer_duration, 1),
-        "words_per_minute": round(wpm, 1),
-        "clarity_score": clarity_score,
-        "confidence_score": confidence_score,
-        "structure_score": structure_score,
-    }
+    structure = _STRUCTURE_SCORES[np.searchsorted(_STRUCTURE_EDGES, word_counts, side="right")]
+
+    return [
+        {
+            "pause_count": int(pause_counts[i]),
+            "filler_word_count": int(filler_totals[i]),
+            "filler_words_detail": json.dumps(filler_details[i]),
+            "answer_duration_seconds": round(float(durations[i]), 1),
+            "words_per_minute": round(float(wpm[i]), 1),
+            "clarity_score": int(clarity[i]),
+            "confidence_score": int(confidence[i]),
+            "structure_score": int(structure[i]),
+        }
+        for i in range(n)
+    ]
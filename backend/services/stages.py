@@ -0,0 +1,89 @@
+"""Per-stage status for the analysis pipeline.
+
+An analysis runs as four stages, each committed on its own so results appear as soon as
+they exist: transcription, heuristics (filler/pace/pause metrics), llm_analytics (the
+Gemini delivery scores) and coaching. A stage row records its status and timing; stages
+without a row are pending. The rows are kept, so a slow attempt can be looked into
+after the fact; stage durations also feed the metrics histograms.
+"""
+import time
+
+from sqlalchemy.orm import Session
+
+from database import AnalysisStage
+from services.metrics import STAGE_COMMIT_SECONDS, STAGE_SECONDS
+
+STAGES = ("transcription", "heuristics", "llm_analytics", "coaching")
+
+
+def _row(db: Session, attempt_id: int, stage: str) -> AnalysisStage:
+    row = db.query(AnalysisStage).filter_by(attempt_id=attempt_id, stage=stage).first()
+    if row is None:
+        row = AnalysisStage(attempt_id=attempt_id, stage=stage, status="pending")
+        db.add(row)
+    return row
+
+
+def stage_statuses(db: Session, attempt_id: int) -> dict[str, str]:
+    rows = db.query(AnalysisStage.stage, AnalysisStage.status).filter_by(attempt_id=attempt_id).all()
+    statuses = dict.fromkeys(STAGES, "pending")
+    statuses.update(rows)
+    return statuses
+
+
+def start_stage(db: Session, attempt_id: int, stage: str):
+    """Mark a stage as running and commit, so status readers see it straight away."""
+    row = _row(db, attempt_id, stage)
+    row.status = "running"
+    row.error = None
+    row.started_at = time.time()
+    row.finished_at = None
+    db.commit()
+
+
+def finish_stage(db: Session, attempt_id: int, stage: str, error: str | None = None):
+    """Mark a stage done (or failed, with `error`). Commits with the caller's pending changes."""
+    row = _row(db, attempt_id, stage)
+    row.status = "failed" if error else "done"
+    row.error = error[:2000] if error else None
+    row.finished_at = time.time()
+    with STAGE_COMMIT_SECONDS.time(stage=stage):
+        db.commit()
+    if row.started_at is not None:
+        STAGE_SECONDS.observe(row.finished_at - row.started_at, stage=stage, status=row.status)
+
+
+def abandon_stages(db: Session, attempt_id: int, error: str):
+    """Mark every unfinished stage as failed once the job has given up."""
+    now = time.time()
+    abandoned = []
+    for stage in STAGES:
+        row = _row(db, attempt_id, stage)
+        if row.status in ("pending", "running"):
+            row.status = "failed"
+            row.error = error
+            row.finished_at = now
+            if row.started_at is not None:
+                abandoned.append((stage, now - row.started_at))
+    db.commit()
+    for stage, seconds in abandoned:
+        STAGE_SECONDS.observe(seconds, stage=stage, status="failed")
+
+
+def stage_timings(db: Session, attempt_id: int) -> dict[str, dict]:
+    """Status, start, finish and duration (seconds) of each stage that has run."""
+    rows = db.query(AnalysisStage).filter_by(attempt_id=attempt_id).all()
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    return {
+        row.stage: {
+            "status": row.status,
+            "started_at": row.started_at,
+            "finished_at": row.finished_at,
+            "seconds": (
+                round(row.finished_at - row.started_at, 3)
+                if row.started_at is not None and row.finished_at is not None else None
+            ),
+            "error": row.error,
+        }
+        for row in sorted(rows, key=lambda row: order.get(row.stage, len(order)))
+    }
@@ -0,0 +1,201 @@
+"""Transcribe a recording while it is still uploading.
+
+The browser sends the MediaRecorder output in chunks. Each session appends them to a
+growing ``.webm`` and a background thread decodes the audio that has arrived since the
+last committed word. Whenever a full window is available it is transcribed and the
+words that end safely before the window edge are committed; the rest is transcribed
+again with the next window. When the upload finishes only the short tail is left.
+
+The browser's webm has no cues, so ffmpeg reads the file from the start on every
+decode. Decoding therefore waits until a full window of new audio can have arrived:
+either enough wall time has passed (recording is real time) or enough bytes have
+arrived (after a burst), judged by the bytes per second of audio seen so far.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from services.audio import SAMPLE_RATE, decode_audio
+from services.transcription import transcribe_samples
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "uploads")
+
+WINDOW_SECONDS = float(os.environ.get("STARCOACH_STREAM_WINDOW_SECONDS", "30"))
+GUARD_SECONDS = 2.0  # the end of a growing file may hold a partial frame
+EDGE_SECONDS = 1.0  # words ending this close to a window edge may be cut off
+SESSION_TTL_SECONDS = 3600
+REAP_INTERVAL_SECONDS = 60
+
+
+class StreamingSession:
+    def __init__(self, question_id: int, timer_setting: int):
+        self.upload_id = uuid.uuid4().hex
+        self.question_id = question_id
+        self.timer_setting = timer_setting
+        self.path = os.path.join(UPLOADS_DIR, f"{self.upload_id}.webm")
+        self.bytes_received = 0
+        self.last_activity = time.time()
+
+        self.words: list[dict] = []
+        self.committed_until = 0.0  # seconds of audio fully transcribed
+
+        # What the last decode saw, for deciding when the next one is worth it
+        self._decoded_at = time.monotonic()
+        self._decoded_bytes = 0
+        self._decoded_until = 0.0
+
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        os.makedirs(UPLOADS_DIR, exist_ok=True)
+        open(self.path, "wb").close()
+        self._thread = threading.Thread(
+            target=self._run, name=f"stream-{self.upload_id[:8]}", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, data: bytes):
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self.bytes_received += len(data)
+        self.last_activity = time.time()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed.is_set():
+                return
+            if not self._decode_due():
+                continue
+            try:
+                self._advance(final=False)
+            except Exception:
+                # Best effort: whatever isn't committed here is transcribed on finish
+                logger.exception("Streaming transcription failed for upload %s", self.upload_id)
+
+    def _decode_due(self) -> bool:
+        """Whether a full window of uncommitted audio may have arrived since the last decode."""
+        needed = WINDOW_SECONDS + GUARD_SECONDS - (self._decoded_until - self.committed_until)
+        elapsed = time.monotonic() - self._decoded_at
+        if elapsed >= needed:
+            return True
+        if self._decoded_until <= 0:
+            # No byte rate known yet; the file is still small, so look every few seconds
+            return elapsed >= GUARD_SECONDS
+        bytes_per_second = self._decoded_bytes / self._decoded_until
+        return self.bytes_received - self._decoded_bytes >= needed * bytes_per_second
+
+    def _advance(self, final: bool):
+        received = self.bytes_received
+        audio = decode_audio(self.path, self.committed_until)
+        self._decoded_at = time.monotonic()
+        self._decoded_bytes = received
+        self._decoded_until = self.committed_until + len(audio) / SAMPLE_RATE
+        guard = 0.0 if final else GUARD_SECONDS
+        window = int(WINDOW_SECONDS * SAMPLE_RATE)
+        while len(audio) / SAMPLE_RATE - guard >= WINDOW_SECONDS:
+            consumed = self._commit(audio[:window], final=False)
+            audio = audio[int(consumed * SAMPLE_RATE):]
+        if final and len(audio) >= SAMPLE_RATE // 10:
+            self._commit(audio, final=True)
+
+    def _commit(self, samples: np.ndarray, final: bool) -> float:
+        """Transcribe one window and keep the words that are safe. Returns seconds consumed."""
+        offset = self.committed_until
+        window_seconds = len(samples) / SAMPLE_RATE
+        _text, words = transcribe_samples(np.ascontiguousarray(samples))
+
+        if final:
+            keep = words
+            consumed = window_seconds
+        else:
+            cutoff = window_seconds - EDGE_SECONDS
+            keep = [w for w in words if w["end"] <= cutoff]
+            consumed = keep[-1]["end"] if keep else cutoff
+            consumed = max(consumed, EDGE_SECONDS)  # always make progress
+
+        self.words.extend(
+            {"word": w["word"], "start": round(w["start"] + offset, 2), "end": round(w["end"] + offset, 2)}
+            for w in keep
+        )
+        self.committed_until = offset + consumed
+        return consumed
+
+    def finish(self) -> tuple[str, list[dict]]:
+        """Stop the background thread and transcribe the remaining tail.
+
+        Returns (transcript_text, words) for the whole recording.
+        """
+        self._closed.set()
+        self._wake.set()
+        self._thread.join()
+        self._advance(final=True)
+        transcript_text = " ".join(w["word"] for w in self.words if w["word"])
+        return transcript_text, self.words
+
+    def discard(self):
+        self._closed.set()
+        self._wake.set()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+_sessions: dict[str, StreamingSession] = {}
+_sessions_lock = threading.Lock()
+_reaper: threading.Thread | None = None
+
+
+def _reap_idle_sessions():
+    now = time.time()
+    with _sessions_lock:
+        stale = [s for s in _sessions.values() if now - s.last_activity > SESSION_TTL_SECONDS]
+        for session in stale:
+            del _sessions[session.upload_id]
+    for session in stale:
+        logger.info("Discarding idle upload %s", session.upload_id)
+        session.discard()
+
+
+def _run_reaper():
+    while True:
+        time.sleep(REAP_INTERVAL_SECONDS)
+        try:
+            _reap_idle_sessions()
+        except Exception:
+            logger.exception("Failed to reap idle uploads")
+
+
+def _start_reaper():
+    """Reap abandoned sessions on a timer, so they go away even if no new upload starts."""
+    global _reaper
+    with _sessions_lock:
+        if _reaper is not None:
+            return
+        _reaper = threading.Thread(target=_run_reaper, name="stream-reaper", daemon=True)
+    _reaper.start()
+
+
+def start_session(question_id: int, timer_setting: int) -> StreamingSession:
+    _start_reaper()
+    _reap_idle_sessions()
+    session = StreamingSession(question_id, timer_setting)
+    with _sessions_lock:
+        _sessions[session.upload_id] = session
+    return session
+
+
+def get_session(upload_id: str) -> StreamingSession | None:
+    with _sessions_lock:
+        return _sessions.get(upload_id)
+
+
+def pop_session(upload_id: str) -> StreamingSession | None:
+    with _sessions_lock:
+        return _sessions.pop(upload_id, None)
@@ -1,41 +1,173 @@
-import json
+import logging
+import multiprocessing
 import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 
-RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "recordings")
+import numpy as np
 
-_model = None
+from services.asr import get_backend
+from services.audio import load_audio
+from services.metrics import register_collector
 
+logger = logging.getLogger(__name__)
 
-def _get_model():
-    global _model
-    if _model is None:
-        import whisper
-        _model = whisper.load_model("small")
-    return _model
+# 0 transcribes in the calling process; N > 0 runs a pool of N processes, each with its own model
+TRANSCRIBE_PROCESSES = int(os.environ.get("STARCOACH_TRANSCRIBE_PROCESSES", "0"))
 
+# One model instance can't safely run two transcriptions at once
+_model_lock = threading.Lock()
 
-def transcribe_audio(video_filename: str) -> tuple[str, str]:
-    """Transcribe a video file using Whisper. Returns (transcript_text, word_timestamps_json)."""
-    # Prevent path traversal by using only the basename
-    safe_filename = os.path.basename(video_filename)
-    filepath = os.path.join(RECORDINGS_DIR, safe_filename)
 
-    model = _get_model()
-    result = model.transcribe(
-        filepath,
-        word_timestamps=True,
-        initial_prompt="Include filler words like um, uh, you know, I mean, like, actually, basically.",
+def _transcribe_local(video_filename: str) -> tuple[str, list[dict]]:
+    # Decoded once per attempt and memory-mapped; re-runs never touch the video
+    audio = load_audio(video_filename)
+
+    with _model_lock:
+        return get_backend().transcribe(audio)
+
+
+def _transcribe_samples_local(samples: np.ndarray) -> tuple[str, list[dict]]:
+    with _model_lock:
+        return get_backend().transcribe(samples)
+
+
+def _init_pool_worker(threads: int):
+    """Runs once in each pool process: split the CPU cores and load the model up front."""
+    get_backend(threads=threads).load()
+
+
+def _ping(_arg) -> int:
+    return os.getpid()
+
+
+class TranscriptionEngine:
+    """A pool of worker processes, each holding one resident ASR model.
+
+    Jobs go to whichever process is idle, so several transcriptions run in parallel
+    instead of queueing behind a single model and the GIL.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        threads = max(1, (os.cpu_count() or 1) // processes)
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            # fork is unsafe once torch has started its own threads
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pool_worker,
+            initargs=(threads,),
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def submit(self, video_filename: str) -> Future:
+        return self._submit(_transcribe_local, video_filename)
+
+    def submit_samples(self, samples: np.ndarray) -> Future:
+        return self._submit(_transcribe_samples_local, samples)
+
+    def _submit(self, fn, arg) -> Future:
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(fn, arg)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, _future: Future):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+        return {
+            "processes": self.processes,
+            "active": min(pending, self.processes),
+            "queue_depth": max(pending - self.processes, 0),
+        }
+
+    def warm_up(self):
+        """Start every pool process now; each loads its model as it starts.
+
+        Submitting one task per process while none is idle makes the executor spawn
+        all of them. Blocks until the models are loaded.
+        """
+        futures = [self._submit(_ping, None) for _ in range(self.processes)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_engine: TranscriptionEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> TranscriptionEngine | None:
+    """Return the shared process pool, or None when transcribing in-process."""
+    global _engine
+    if TRANSCRIBE_PROCESSES <= 0:
+        return None
+    with _engine_lock:
+        if _engine is None:
+            logger.info("Starting transcription engine with %d processes", TRANSCRIBE_PROCESSES)
+            _engine = TranscriptionEngine(TRANSCRIBE_PROCESSES)
+        return _engine
+
+
+def shutdown_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.shutdown()
+            _engine = None
+
+
+def engine_stats() -> dict:
+    with _engine_lock:
+        engine = _engine
+    if engine is None:
+        return {"processes": 0, "active": 0, "queue_depth": 0}
+    return engine.stats()
+
+
+def _collect_metrics():
+    stats = engine_stats()
+    yield "starcoach_transcription_active", "Transcriptions running in the process pool", "gauge", [({}, stats["active"])]
+    yield (
+        "starcoach_transcription_queue_depth",
+        "Transcriptions waiting for a free pool process",
+        "gauge",
+        [({}, stats["queue_depth"])],
     )
 
-    transcript_text = result.get("text", "").strip()
 
-    words = []
-    for segment in result.get("segments", []):
-        for word_info in segment.get("words", []):
-            words.append({
-                "word": word_info["word"].strip(),
-                "start": round(word_info["start"], 2),
-                "end": round(word_info["end"], 2),
-            })
+register_collector(_collect_metrics)
+
+
+def warm_up():
+    """Load the ASR model now instead of during the first transcription. Blocks until done."""
+    engine = get_engine()
+    if engine is None:
+        with _model_lock:
+            get_backend().load()
+    else:
+        engine.warm_up()
+
+
+def transcribe_words(video_filename: str) -> tuple[str, list[dict]]:
+    """Transcribe a video file with the configured ASR backend. Returns (transcript_text, words)."""
+    engine = get_engine()
+    if engine is None:
+        return _transcribe_local(video_filename)
+    return engine.submit(video_filename).result()
+
 
-    return transcript_text, json.dumps(words)
+def transcribe_samples(samples: np.ndarray) -> tuple[str, list[dict]]:
+    """Transcribe an in-memory 16 kHz mono float32 array. Returns (transcript_text, words)."""
+    engine = get_engine()
+    if engine is None:
+        return _transcribe_samples_local(samples)
+    return engine.submit_samples(samples).result()
@@ -0,0 +1,201 @@
+"""Resumable chunked uploads.
+
+A client opens an upload with the total size, sends the file as chunks at explicit
+offsets, each with a SHA-256 of its bytes, and finalizes once every byte has arrived.
+If the connection drops it asks for the current offset and continues from there.
+
+State lives on disk next to the data: ``<upload_id>.part`` holds the bytes received so
+far (its length is the offset) and ``<upload_id>.json`` holds the upload's metadata, so
+an upload survives a server restart. All functions here block on file I/O; call them
+from a worker thread, never from the event loop.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from services.streaming import UPLOADS_DIR
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES = int(os.environ.get("STARCOACH_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+MAX_CHUNK_BYTES = 4 * CHUNK_BYTES
+UPLOAD_TTL_SECONDS = 24 * 3600
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# One lock per upload: chunks for the same upload are written one at a time
+_locks: dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """A chunk or finalize request the upload cannot accept.
+
+    ``status`` is the HTTP status the API should answer with.
+    """
+
+    def __init__(self, status: int, message: str, offset: int | None = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def _paths(upload_id: str) -> tuple[str, str]:
+    return (
+        os.path.join(UPLOADS_DIR, f"{upload_id}.part"),
+        os.path.join(UPLOADS_DIR, f"{upload_id}.json"),
+    )
+
+
+def _lock(upload_id: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def _read_meta(upload_id: str) -> dict | None:
+    if not _UPLOAD_ID.match(upload_id):
+        return None
+    _part, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _received(upload_id: str) -> int | None:
+    """Bytes received so far, or None once the upload has been finalized or removed."""
+    part_path, _meta = _paths(upload_id)
+    try:
+        return os.path.getsize(part_path)
+    except FileNotFoundError:
+        return None
+
+
+def _remove(upload_id: str):
+    # The upload's lock stays: another request may be waiting on it. It finds the files
+    # gone once it gets the lock, and reap_stale_uploads drops the lock later.
+    for path in _paths(upload_id):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _drop_finished_locks():
+    with _locks_lock:
+        for upload_id, lock in list(_locks.items()):
+            if _read_meta(upload_id) is None and lock.acquire(blocking=False):
+                # Anyone who still holds a reference finds the upload gone and answers 404
+                del _locks[upload_id]
+                lock.release()
+
+
+def reap_stale_uploads():
+    """Delete uploads nobody has written to for UPLOAD_TTL_SECONDS."""
+    _drop_finished_locks()
+    if not os.path.isdir(UPLOADS_DIR):
+        return
+    cutoff = time.time() - UPLOAD_TTL_SECONDS
+    for name in os.listdir(UPLOADS_DIR):
+        upload_id, ext = os.path.splitext(name)
+        if ext != ".json":
+            continue
+        part_path, meta_path = _paths(upload_id)
+        try:
+            last_write = max(os.path.getmtime(p) for p in (part_path, meta_path) if os.path.exists(p))
+        except ValueError:
+            continue
+        if last_write < cutoff:
+            logger.info("Discarding abandoned upload %s", upload_id)
+            _remove(upload_id)
+
+
+def create_upload(question_id: int, timer_setting: int, size: int) -> dict:
+    reap_stale_uploads()
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = _paths(upload_id)
+    meta = {
+        "upload_id": upload_id,
+        "question_id": question_id,
+        "timer_setting": timer_setting,
+        "size": size,
+        "created_at": time.time(),
+    }
+    open(part_path, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return {**meta, "offset": 0, "chunk_size": CHUNK_BYTES}
+
+
+def upload_status(upload_id: str) -> dict | None:
+    meta = _read_meta(upload_id)
+    received = _received(upload_id) if meta else None
+    if received is None:
+        return None
+    return {**meta, "offset": received, "chunk_size": CHUNK_BYTES}
+
+
+def write_chunk(upload_id: str, offset: int, data: bytes, sha256: str) -> int:
+    """Append ``data`` at ``offset`` after checking its digest. Returns the new offset.
+
+    Re-sending a chunk that is already stored (same offset, same bytes) succeeds
+    without writing, so a client that lost the response can simply retry.
+    """
+    meta = _read_meta(upload_id)
+    if meta is None:
+        raise UploadError(404, "Upload not found")
+    if hashlib.sha256(data).hexdigest() != sha256.lower():
+        raise UploadError(422, "Chunk checksum mismatch")
+
+    part_path, _meta = _paths(upload_id)
+    with _lock(upload_id):
+        current = _received(upload_id)
+        if current is None:
+            raise UploadError(404, "Upload not found")  # finalized or cancelled meanwhile
+        if offset + len(data) > meta["size"]:
+            raise UploadError(413, "Chunk extends past the declared upload size", current)
+        if offset < current and offset + len(data) <= current:
+            with open(part_path, "rb") as f:
+                f.seek(offset)
+                if f.read(len(data)) == data:
+                    return current
+        if offset != current:
+            raise UploadError(409, "Offset does not match the bytes received", current)
+        with open(part_path, "ab") as f:
+            f.write(data)
+        return current + len(data)
+
+
+def finalize_upload(upload_id: str, destination: str) -> dict:
+    """Move a complete upload to ``destination`` and return its metadata."""
+    if _read_meta(upload_id) is None:
+        raise UploadError(404, "Upload not found")
+    part_path, _meta = _paths(upload_id)
+    with _lock(upload_id):
+        # Checked again under the lock: a concurrent finalize or cancel may have won
+        meta = _read_meta(upload_id)
+        received = _received(upload_id) if meta else None
+        if received is None:
+            raise UploadError(404, "Upload not found")
+        if received != meta["size"]:
+            raise UploadError(409, "Upload is incomplete", received)
+        os.replace(part_path, destination)
+        _remove(upload_id)
+    return meta
+
+
+def cancel_upload(upload_id: str) -> bool:
+    if _read_meta(upload_id) is None:
+        return False
+    with _lock(upload_id):
+        if _read_meta(upload_id) is None:
+            return False
+        _remove(upload_id)
+    return True
@@ -0,0 +1,43 @@
+"""Per-resource change counters behind the conditional-GET cache.
+
+Write paths call ``bump_question`` in the same transaction as the rows they change, so a
+counter moves exactly when the data it covers does. ``read_versions`` is a single
+primary-key lookup on a Core connection, cheap enough to run on every cached GET.
+
+Resources:
+    questions     - the question list itself (seeding)
+    attempts      - any attempt or analysis write (question counts, dashboard)
+    question:<id> - attempts and analysis results for one question
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import engine, ResourceVersion, upsert_increment
+
+QUESTIONS = "questions"
+ATTEMPTS = "attempts"
+
+_versions = ResourceVersion.__table__
+
+
+def question_key(question_id: int) -> str:
+    return f"question:{question_id}"
+
+
+def bump(db: Session, *resources: str):
+    for resource in resources:
+        upsert_increment(db, ResourceVersion, {"resource": resource}, {"version": 1})
+
+
+def bump_question(db: Session, question_id: int):
+    """Record a change to an attempt (or its analysis) of `question_id`."""
+    bump(db, ATTEMPTS, question_key(question_id))
+
+
+def read_versions(resources: tuple[str, ...]) -> tuple[int, ...]:
+    """Current counters for `resources`, in order; resources never bumped are 0."""
+    with engine.connect() as conn:
+        rows = dict(conn.execute(
+            select(_versions.c.resource, _versions.c.version).where(_versions.c.resource.in_(resources))
+        ).all())
+    return tuple(rows.get(resource, 0) for resource in resources)
@@ -0,0 +1,100 @@
+"""Compact binary encoding for word timestamps.
+
+Stored in ``Transcription.word_timestamps_blob``. Little-endian layout:
+
+    b"WTS1"                 magic
+    uint32 n                word count
+    float32 starts[n]
+    float32 ends[n]
+    uint32 offsets[n + 1]   byte offsets of each word in the table below
+    utf-8 word table
+
+``decode_arrays`` returns NumPy views over the blob, without copying or parsing it.
+Scoring needs float64 seconds, so ``timing_arrays`` makes one copy of each array.
+JSON is only produced when an API client asks for it.
+"""
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"WTS1"
+_HEADER = struct.Struct("<4sI")
+
+
+def encode_words(words: list[dict]) -> bytes:
+    """Encode a list of {"word", "start", "end"} dicts."""
+    n = len(words)
+    starts = np.fromiter((w["start"] for w in words), dtype="<f4", count=n)
+    ends = np.fromiter((w["end"] for w in words), dtype="<f4", count=n)
+    encoded = [w["word"].encode("utf-8") for w in words]
+    offsets = np.zeros(n + 1, dtype="<u4")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return b"".join([
+        _HEADER.pack(MAGIC, n),
+        starts.tobytes(),
+        ends.tobytes(),
+        offsets.tobytes(),
+        *encoded,
+    ])
+
+
+def _layout(blob: bytes | memoryview) -> tuple[int, int]:
+    magic, n = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded word timestamp blob")
+    return n, _HEADER.size
+
+
+def decode_arrays(blob: bytes | memoryview) -> tuple[np.ndarray, np.ndarray]:
+    """Return (starts, ends) as read-only float32 views over the blob (any buffer)."""
+    n, pos = _layout(blob)
+    starts = np.frombuffer(blob, dtype="<f4", count=n, offset=pos)
+    ends = np.frombuffer(blob, dtype="<f4", count=n, offset=pos + 4 * n)
+    return starts, ends
+
+
+def decode_words(blob: bytes) -> list[str]:
+    n, pos = _layout(blob)
+    offsets = np.frombuffer(blob, dtype="<u4", count=n + 1, offset=pos + 8 * n)
+    table = memoryview(blob)[pos + 12 * n + 4:]
+    return [bytes(table[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in range(n)]
+
+
+def to_dicts(blob: bytes) -> list[dict]:
+    """Decode back into the {"word", "start", "end"} shape (2-decimal seconds)."""
+    starts, ends = decode_arrays(blob)
+    return [
+        {"word": word, "start": round(float(s), 2), "end": round(float(e), 2)}
+        for word, s, e in zip(decode_words(blob), starts, ends)
+    ]
+
+
+def to_json(blob: bytes | None, legacy_json: str | None = None) -> str | None:
+    """JSON for API responses, from the blob or a legacy JSON text column."""
+    if blob is not None:
+        return json.dumps(to_dicts(blob))
+    return legacy_json
+
+
+def timing_arrays(value: bytes | str | None) -> tuple[np.ndarray, np.ndarray]:
+    """(starts, ends) in float64 seconds from a blob or legacy JSON text.
+
+    Blob timings are widened to float64 (the one copy) and rounded in place back to the
+    2-decimal values they were stored from, so gap arithmetic gives the same results as
+    the original JSON.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        arrays = []
+        for view in decode_arrays(memoryview(value)):
+            seconds = view.astype(np.float64)
+            arrays.append(np.round(seconds, 2, out=seconds))
+        return arrays[0], arrays[1]
+
+    try:
+        timestamps = json.loads(value) if value else []
+    except json.JSONDecodeError:
+        timestamps = []
+    starts = np.fromiter((w["start"] for w in timestamps), dtype=np.float64, count=len(timestamps))
+    ends = np.fromiter((w["end"] for w in timestamps), dtype=np.float64, count=len(timestamps))
+    return starts, ends
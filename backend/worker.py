@@ -0,0 +1,162 @@
+"""Analysis worker: claims queued jobs from the shared database and runs them.
+
+Run one or more of these next to the API (on the same host or any host that can
+reach the database):
+
+    uv run python worker.py --workers 2
+    uv run python worker.py --workers 2 --metrics-port 9100   # Prometheus metrics at :9100/metrics
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+import traceback
+
+from database import SessionLocal, init_db
+from routers.analysis import run_analysis, record_analysis_failure
+from services.jobs import (
+    LEASE_SECONDS,
+    claim_job,
+    complete_job,
+    fail_job,
+    make_worker_id,
+    renew_lease,
+)
+from services.gemini import shutdown_gateway
+from services.metrics import JOB_QUEUE_WAIT_SECONDS, JOB_SECONDS, serve as serve_metrics
+from services.profiling import profile_job
+from services.readiness import ASR_WARMUP, warm_up_asr
+from services.retention import after_analysis, start_compactor
+from services.rollups import ensure_rollups
+from services.transcription import shutdown_engine
+
+logger = logging.getLogger(__name__)
+
+WORKER_COUNT = int(os.environ.get("STARCOACH_ANALYSIS_WORKERS", "1"))
+POLL_INTERVAL_SECONDS = float(os.environ.get("STARCOACH_JOB_POLL_SECONDS", "2"))
+_metrics_port = os.environ.get("STARCOACH_WORKER_METRICS_PORT", "")
+METRICS_PORT = int(_metrics_port) if _metrics_port else None
+
+
+def _keep_lease(job_id: int, worker_id: str, done: threading.Event):
+    """Renew the job lease until the job finishes, so long transcriptions aren't reclaimed."""
+    while not done.wait(LEASE_SECONDS / 3):
+        db = SessionLocal()
+        try:
+            if not renew_lease(db, job_id, worker_id):
+                logger.warning("Lost lease on job %d", job_id)
+                return
+        except Exception:
+            logger.exception("Failed to renew lease on job %d", job_id)
+        finally:
+            db.close()
+
+
+def process_one(worker_id: str) -> bool:
+    """Claim and run a single job. Returns False if the queue was empty."""
+    db = SessionLocal()
+    try:
+        job = claim_job(db, worker_id)
+        if job is None:
+            return False
+        job_id, attempt_id = job.id, job.attempt_id
+        over_limit = job.tries > job.max_tries
+        profile = bool(job.profile)
+        # updated_at is the claim time; retries count from when they became runnable again
+        JOB_QUEUE_WAIT_SECONDS.observe(max(job.updated_at - job.available_at, 0))
+    finally:
+        db.close()
+
+    if over_limit:
+        # Reclaimed after its last allowed try died with the worker
+        error = "Lease expired on final try"
+    else:
+        logger.info("Worker %s running job %d (attempt %d)", worker_id, job_id, attempt_id)
+        done = threading.Event()
+        heartbeat = threading.Thread(target=_keep_lease, args=(job_id, worker_id, done), daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            with profile_job(job_id, attempt_id, profile):
+                run_analysis(attempt_id)
+            error = None
+        except Exception:
+            logger.exception("Job %d failed for attempt %d", job_id, attempt_id)
+            error = traceback.format_exc()
+        finally:
+            done.set()
+        JOB_SECONDS.observe(time.perf_counter() - started, outcome="failed" if error else "done")
+
+    db = SessionLocal()
+    try:
+        if error is None:
+            complete_job(db, job_id, worker_id)
+            after_analysis(attempt_id)
+        elif fail_job(db, job_id, worker_id, error):
+            record_analysis_failure(attempt_id)
+    finally:
+        db.close()
+    return True
+
+
+def run_worker(stop: threading.Event, poll_interval: float = POLL_INTERVAL_SECONDS):
+    worker_id = make_worker_id()
+    logger.info("Analysis worker %s started", worker_id)
+    while not stop.is_set():
+        try:
+            if process_one(worker_id):
+                continue
+        except Exception:
+            logger.exception("Worker %s hit an unexpected error", worker_id)
+        stop.wait(poll_interval)
+    logger.info("Analysis worker %s stopped", worker_id)
+
+
+def start_workers(count: int = WORKER_COUNT) -> tuple[threading.Event, list[threading.Thread]]:
+    """Start `count` worker threads in this process. Set the returned event to stop them."""
+    stop = threading.Event()
+    threads = []
+    for i in range(count):
+        t = threading.Thread(target=run_worker, args=(stop,), name=f"analysis-worker-{i}", daemon=True)
+        t.start()
+        threads.append(t)
+    return stop, threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run STARCoach analysis workers")
+    parser.add_argument("--workers", type=int, default=WORKER_COUNT, help="number of concurrent jobs")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_SECONDS)
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    ensure_rollups()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    if ASR_WARMUP:
+        # Before claiming jobs, so the first job's lease isn't spent loading the model
+        warm_up_asr()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    threads = [
+        threading.Thread(target=run_worker, args=(stop, args.poll_interval), name=f"analysis-worker-{i}")
+        for i in range(args.workers)
+    ]
+    for t in threads:
+        t.start()
+    start_compactor(stop)
+    for t in threads:
+        t.join()
+    shutdown_engine()
+    shutdown_gateway()
+
+
+if __name__ == "__main__":
+    main()
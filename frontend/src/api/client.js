@@ -16,6 +16,75 @@ export async function uploadRecording(formData) {
   return data
 }
 
+async function sha256Hex(buffer) {
+  const digest = await crypto.subtle.digest('SHA-256', buffer)
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('')
+}
+
+// Resumable upload: the blob is sent in checksummed chunks. After a failed chunk the
+// server is asked how much it has, and the upload continues from there.
+export async function uploadResumable(blob, questionId, timerSetting, durationSeconds, retries = 5) {
+  const formData = new FormData()
+  formData.append('question_id', questionId)
+  formData.append('timer_setting', timerSetting)
+  formData.append('size', blob.size)
+  const { data: upload } = await api.post('/recordings/uploads', formData)
+  const url = `/recordings/uploads/${upload.upload_id}`
+
+  let offset = upload.offset
+  let failures = 0
+  while (offset < blob.size) {
+    const chunk = await blob.slice(offset, offset + upload.chunk_size).arrayBuffer()
+    try {
+      const { data } = await api.put(url, chunk, {
+        params: { offset },
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'X-Chunk-SHA256': await sha256Hex(chunk),
+        },
+      })
+      offset = data.offset
+      failures = 0
+    } catch (err) {
+      failures += 1
+      if (failures > retries) throw err
+      await new Promise((resolve) => setTimeout(resolve, 1000 * failures))
+      try {
+        offset = (await api.get(url)).data.offset
+      } catch {
+        // Still offline; retry the same chunk
+      }
+    }
+  }
+
+  const finalizeData = new FormData()
+  finalizeData.append('duration_seconds', durationSeconds)
+  const { data } = await api.post(`${url}/finalize`, finalizeData)
+  return data
+}
+
+export async function startStreamingUpload(questionId, timerSetting) {
+  const formData = new FormData()
+  formData.append('question_id', questionId)
+  formData.append('timer_setting', timerSetting)
+  const { data } = await api.post('/recordings/stream', formData)
+  return data
+}
+
+export async function appendStreamingChunk(uploadId, chunk) {
+  const { data } = await api.post(`/recordings/stream/${uploadId}/chunks`, chunk, {
+    headers: { 'Content-Type': 'application/octet-stream' },
+  })
+  return data
+}
+
+export async function finishStreamingUpload(uploadId, durationSeconds) {
+  const formData = new FormData()
+  formData.append('duration_seconds', durationSeconds)
+  const { data } = await api.post(`/recordings/stream/${uploadId}/finish`, formData)
+  return data
+}
+
 export async function triggerAnalysis(attemptId) {
   const { data } = await api.post(`/analyze/${attemptId}`)
   return data
@@ -26,8 +95,23 @@ export async function getAnalysisStatus(attemptId) {
   return data
 }
 
-export async function getAttempts(questionId) {
-  const { data } = await api.get(`/attempts/${questionId}`)
+// Server-Sent Events: a "status" event, then one event per completed analysis stage
+export const ANALYSIS_EVENTS = ['status', 'transcription', 'heuristics', 'llm_analytics', 'coaching']
+
+export function subscribeToAnalysis(attemptId) {
+  return new EventSource(`/api/analyze/${attemptId}/events`)
+}
+
+// One page of attempt summaries; pass the returned nextCursor to get the next page
+export async function getAttempts(questionId, cursor = null) {
+  const { data, headers } = await api.get(`/attempts/${questionId}`, {
+    params: cursor ? { cursor } : {},
+  })
+  return { items: data, nextCursor: headers['x-next-cursor'] || null }
+}
+
+export async function getAttempt(questionId, attemptId) {
+  const { data } = await api.get(`/attempts/${questionId}/${attemptId}`)
   return data
 }
 
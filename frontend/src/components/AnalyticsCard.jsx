@@ -97,7 +97,7 @@ function MetricRowWithLLM({ label, heuristicScore, llmScore, llmJustification })
   )
 }
 
-export default function AnalyticsCard({ analytics }) {
+export default function AnalyticsCard({ analytics, llmPending = false }) {
   if (!analytics) {
     return (
       <div className="bg-gray-800 rounded-xl p-6">
@@ -116,6 +116,10 @@ export default function AnalyticsCard({ analytics }) {
     <div className="bg-gray-800 rounded-xl p-6">
       <h3 className="text-lg font-semibold mb-3">Speech Analytics</h3>
 
+      {llmPending && (
+        <p className="text-xs text-gray-400 mb-2">AI scores are still being generated...</p>
+      )}
+
       <div className="divide-y divide-gray-700">
         <MetricRowWithLLM
           label="Clarity"
@@ -1,4 +1,4 @@
-export default function AttemptList({ attempts, selectedId, onSelect }) {
+export default function AttemptList({ attempts, selectedId, onSelect, hasMore = false, onLoadMore }) {
   if (!attempts || attempts.length === 0) {
     return (
       <div className="bg-gray-800 rounded-xl p-6">
@@ -15,7 +15,7 @@ export default function AttemptList({ attempts, selectedId, onSelect }) {
         {attempts.map((item) => {
           const a = item.attempt
           const isSelected = a.id === selectedId
-          const hasAnalysis = !!item.feedback
+          const hasAnalysis = item.analyzed
 
           return (
             <button
@@ -45,6 +45,14 @@ export default function AttemptList({ attempts, selectedId, onSelect }) {
           )
         })}
       </div>
+      {hasMore && (
+        <button
+          onClick={onLoadMore}
+          className="w-full mt-3 text-sm text-gray-400 hover:text-white transition-colors"
+        >
+          Load older attempts
+        </button>
+      )}
     </div>
   )
 }
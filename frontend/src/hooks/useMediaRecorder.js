@@ -1,12 +1,14 @@
 import { useState, useRef, useCallback } from 'react'
 
-export default function useMediaRecorder() {
+export default function useMediaRecorder({ onChunk } = {}) {
   const [isRecording, setIsRecording] = useState(false)
   const [videoBlob, setVideoBlob] = useState(null)
   const [stream, setStream] = useState(null)
   const streamRef = useRef(null)
   const mediaRecorderRef = useRef(null)
   const chunksRef = useRef([])
+  const onChunkRef = useRef(onChunk)
+  onChunkRef.current = onChunk
 
   const startCamera = useCallback(async () => {
     const mediaStream = await navigator.mediaDevices.getUserMedia({
@@ -45,6 +47,7 @@ export default function useMediaRecorder() {
     recorder.ondataavailable = (e) => {
       if (e.data.size > 0) {
         chunksRef.current.push(e.data)
+        onChunkRef.current?.(e.data)
       }
     }
 
@@ -1,6 +1,14 @@
 import { useState, useEffect, useCallback, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
-import { fetchQuestions, uploadRecording, triggerAnalysis } from '../api/client'
+import {
+  fetchQuestions,
+  uploadRecording,
+  uploadResumable,
+  triggerAnalysis,
+  startStreamingUpload,
+  appendStreamingChunk,
+  finishStreamingUpload,
+} from '../api/client'
 import useMediaRecorder from '../hooks/useMediaRecorder'
 import useTimer from '../hooks/useTimer'
 import ZoomLayout from '../components/ZoomLayout'
@@ -20,9 +28,23 @@ export default function Interview() {
   const [phase, setPhase] = useState('setup') // setup | recording | uploading | done
   const [error, setError] = useState(null)
   const startTimeRef = useRef(null)
+  // Streaming upload: chunks are sent (and transcribed) while recording.
+  // Falls back to a resumable chunked upload of the whole blob if any step fails,
+  // finishing included.
+  const streamRef = useRef(null)
+
+  const handleChunk = useCallback((chunk) => {
+    const upload = streamRef.current
+    if (!upload || upload.failed) return
+    upload.pending = upload.pending
+      .then((uploadId) => appendStreamingChunk(uploadId, chunk).then(() => uploadId))
+      .catch(() => {
+        upload.failed = true
+      })
+  }, [])
 
   const { isRecording, videoBlob, stream, startCamera, stopCamera, startRecording, stopRecording } =
-    useMediaRecorder()
+    useMediaRecorder({ onChunk: handleChunk })
 
   const handleExpire = useCallback(() => {
     stopRecording()
@@ -44,6 +66,13 @@ export default function Interview() {
   }, [])
 
   const handleStart = () => {
+    const upload = { failed: false }
+    upload.pending = startStreamingUpload(questionId, timerSetting)
+      .then((res) => res.upload_id)
+      .catch(() => {
+        upload.failed = true
+      })
+    streamRef.current = upload
     resetTimer(timerSetting)
     startRecording()
     startTimer()
@@ -62,16 +91,36 @@ export default function Interview() {
       setPhase('uploading')
       const durationSeconds = (Date.now() - startTimeRef.current) / 1000
 
-      const formData = new FormData()
-      formData.append('video', videoBlob, 'recording.webm')
-      formData.append('question_id', questionId)
-      formData.append('timer_setting', timerSetting)
-      formData.append('duration_seconds', durationSeconds.toFixed(1))
-
-      uploadRecording(formData)
-        .then((res) => {
+      const uploadWhole = () => {
+        let sent
+        if (window.crypto?.subtle) {
+          sent = uploadResumable(videoBlob, questionId, timerSetting, durationSeconds.toFixed(1))
+        } else {
+          // crypto.subtle only exists on secure origins; send the blob in one request
+          const formData = new FormData()
+          formData.append('video', videoBlob, 'recording.webm')
+          formData.append('question_id', questionId)
+          formData.append('timer_setting', timerSetting)
+          formData.append('duration_seconds', durationSeconds.toFixed(1))
+          sent = uploadRecording(formData)
+        }
+
+        return sent.then((res) => {
           return triggerAnalysis(res.attempt_id).then(() => res)
         })
+      }
+
+      const upload = streamRef.current
+      const finishUpload = upload
+        ? upload.pending.then((uploadId) =>
+            upload.failed
+              ? uploadWhole()
+              : // The session lives in one API process; after a restart or reap, send the blob
+                finishStreamingUpload(uploadId, durationSeconds.toFixed(1)).catch(() => uploadWhole())
+          )
+        : uploadWhole()
+
+      finishUpload
         .then((res) => {
           setPhase('done')
           stopCamera()
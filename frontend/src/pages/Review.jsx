@@ -1,6 +1,14 @@
 import { useState, useEffect, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
-import { getAttempts, getAnalysisStatus, fetchQuestions, getProgress } from '../api/client'
+import {
+  getAttempts,
+  getAttempt,
+  getAnalysisStatus,
+  subscribeToAnalysis,
+  ANALYSIS_EVENTS,
+  fetchQuestions,
+  getProgress,
+} from '../api/client'
 import AttemptList from '../components/AttemptList'
 import TranscriptView from '../components/TranscriptView'
 import FeedbackPanel from '../components/FeedbackPanel'
@@ -12,7 +20,9 @@ export default function Review() {
   const navigate = useNavigate()
   const [question, setQuestion] = useState(null)
   const [attempts, setAttempts] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [selectedId, setSelectedId] = useState(null)
+  const [detail, setDetail] = useState(null)
   const [progress, setProgress] = useState(null)
   const [loading, setLoading] = useState(true)
   const attemptsRef = useRef(attempts)
@@ -27,43 +37,116 @@ export default function Review() {
       getAttempts(questionId),
       getProgress(questionId).catch(() => null),
     ])
-      .then(([qs, atts, prog]) => {
+      .then(([qs, page, prog]) => {
         const q = qs.find((q) => q.id === Number(questionId))
         setQuestion(q)
-        setAttempts(atts)
+        setAttempts(page.items)
+        setNextCursor(page.nextCursor)
         setProgress(prog)
-        if (atts.length > 0) {
-          setSelectedId(atts[0].attempt.id)
+        if (page.items.length > 0) {
+          setSelectedId(page.items[0].attempt.id)
         }
       })
       .catch(console.error)
       .finally(() => setLoading(false))
   }, [questionId])
 
-  // Poll for analysis status on the selected attempt if it's pending
+  const loadMoreAttempts = async () => {
+    try {
+      const page = await getAttempts(questionId, nextCursor)
+      setAttempts((prev) => [...prev, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (err) {
+      console.error(err)
+    }
+  }
+
+  // The list only has summaries; load transcript, analytics and feedback for the selection
   useEffect(() => {
     if (!selectedId) return
 
-    const selected = attemptsRef.current.find((a) => a.attempt.id === selectedId)
-    if (selected?.feedback) return // already complete
+    let cancelled = false
+    getAttempt(questionId, selectedId)
+      .then((d) => {
+        if (!cancelled) setDetail(d)
+      })
+      .catch(console.error)
+
+    return () => {
+      cancelled = true
+    }
+  }, [selectedId, questionId])
 
-    const interval = setInterval(async () => {
-      try {
-        const status = await getAnalysisStatus(selectedId)
-        if (status.status === 'complete') {
-          const atts = await getAttempts(questionId)
-          setAttempts(atts)
-          clearInterval(interval)
+  // Follow analysis progress on the selected attempt if it's pending
+  useEffect(() => {
+    if (!selectedId) return
+
+    const summary = attemptsRef.current.find((a) => a.attempt.id === selectedId)
+    if (summary?.analyzed) return // already complete
+
+    let interval = null
+    let received = false
+
+    const markAnalyzed = () => {
+      setAttempts((prev) =>
+        prev.map((a) => (a.attempt.id === selectedId ? { ...a, analyzed: true } : a))
+      )
+    }
+
+    // Show each stage's results as soon as the server pushes them
+    const applyStatus = (status) => {
+      setDetail((prev) =>
+        prev && prev.attempt.id === selectedId
+          ? {
+              ...prev,
+              transcription: status.transcription ?? prev.transcription,
+              analytics: status.analytics ?? prev.analytics,
+              feedback: status.feedback ?? prev.feedback,
+              stages: status.stages ?? prev.stages,
+            }
+          : prev
+      )
+      if (status.status === 'complete') markAnalyzed()
+    }
+
+    const startPolling = () => {
+      interval = setInterval(async () => {
+        try {
+          const status = await getAnalysisStatus(selectedId)
+          if (status.status === 'complete') {
+            setDetail(await getAttempt(questionId, selectedId))
+            markAnalyzed()
+            clearInterval(interval)
+          }
+        } catch {
+          // ignore polling errors
         }
-      } catch {
-        // ignore polling errors
+      }, 3000)
+    }
+
+    const source = subscribeToAnalysis(selectedId)
+    const onEvent = (event) => {
+      received = true
+      const status = JSON.parse(event.data)
+      applyStatus(status)
+      if (status.status === 'complete') source.close()
+    }
+    ANALYSIS_EVENTS.forEach((name) => source.addEventListener(name, onEvent))
+    source.onerror = () => {
+      // EventSource reconnects by itself once the stream has worked; poll if it never did
+      if (!received) {
+        source.close()
+        startPolling()
       }
-    }, 3000)
+    }
 
-    return () => clearInterval(interval)
+    return () => {
+      source.close()
+      clearInterval(interval)
+    }
   }, [selectedId, questionId])
 
-  const selected = attempts.find((a) => a.attempt.id === selectedId)
+  const selected = detail?.attempt.id === selectedId ? detail : null
 
   if (loading) {
     return (
@@ -101,6 +184,8 @@ export default function Review() {
             attempts={attempts}
             selectedId={selectedId}
             onSelect={setSelectedId}
+            hasMore={!!nextCursor}
+            onLoadMore={loadMoreAttempts}
           />
         </div>
 
@@ -111,11 +196,20 @@ export default function Review() {
               {/* Video playback */}
               <div className="bg-gray-800 rounded-xl p-6">
                 <h3 className="text-lg font-semibold mb-3">Recording</h3>
-                <video
-                  src={`/recordings/${selected.attempt.video_path}`}
-                  controls
-                  className="w-full rounded-lg max-h-96"
-                />
+                {selected.attempt.video_path === selected.attempt.audio_path ? (
+                  // Archived recording: only the audio was kept
+                  <audio
+                    src={`/recordings/${selected.attempt.video_path}`}
+                    controls
+                    className="w-full"
+                  />
+                ) : (
+                  <video
+                    src={`/recordings/${selected.attempt.video_path}`}
+                    controls
+                    className="w-full rounded-lg max-h-96"
+                  />
+                )}
               </div>
 
               {!selected.feedback && (
@@ -126,7 +220,10 @@ export default function Review() {
 
               <div className="grid grid-cols-2 gap-6">
                 <TranscriptView transcription={selected.transcription} />
-                <AnalyticsCard analytics={selected.analytics} />
+                <AnalyticsCard
+                  analytics={selected.analytics}
+                  llmPending={['pending', 'running'].includes(selected.stages?.llm_analytics)}
+                />
               </div>
 
               <FeedbackPanel feedback={selected.feedback} />
@@ -135,7 +232,7 @@ export default function Review() {
             </>
           ) : (
             <div className="text-gray-400 text-center py-20">
-              Select an attempt to view details.
+              {selectedId ? 'Loading attempt...' : 'Select an attempt to view details.'}
             </div>
           )}
         </div>